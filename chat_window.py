@@ -3,18 +3,226 @@ Chat window module for the SnipAI application.
 Defines the popup chat GUI using customtkinter.
 """
 import threading
+import asyncio
 import logging
 import customtkinter as ctk
 import json
 import re
 import keyboard
 import time
-import pyperclip
-import pyautogui  # Import pyautogui for screen dimensions
+import hashlib
+import contextlib
+import tkinter as tk
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+import event_loop
+import win_api
+
+try:
+    import pygetwindow as gw  # Used to restore focus after pasting
+except ImportError:
+    gw = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Markers and patterns used when parsing LLM responses
+_JSON_FENCE = "```json"
+_FENCE = "```"
+_MULTI_NL_RE = re.compile(r'\n{3,}')
+
+# Instruction appended to every user message sent to the LLM
+_ENHANCE_INSTRUCTION = """
+
+If the user is requesting to enhance, modify, or transform the text in any way,
+include a JSON block with the enhanced content in the following format:
+```json
+{"enhanced_content": "The enhanced text goes here"}
+```
+Only include this JSON block if the user explicitly asks for text enhancement, rewriting, etc."""
+
+# Template for the first message, which includes the selected text as context (filled with % formatting)
+_INITIAL_PROMPT_TEMPLATE = """Selected text:
+```
+%(text)s
+```
+User question: %(question)s"""
+
+# Categorized error prefixes returned by the LLM service, with their display titles
+_ERROR_PREFIXES = frozenset({"API_KEY_ERROR", "CONNECTION_ERROR", "NO_RESPONSE_ERROR"})
+_ERROR_DISPLAY = {prefix: prefix.replace("_", " ") for prefix in _ERROR_PREFIXES}
+
+# Responses returned by the LLM service for failed requests; these are never cached
+_LLM_ERROR_PREFIXES = tuple(f"{prefix}:" for prefix in _ERROR_PREFIXES) + ("ERROR:",)
+
+# In-process LRU cache of LLM responses, shared by all chat windows.
+# Keys are digests of the conversation so far plus the new prompt.
+_RESPONSE_CACHE_SIZE = 128
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+# Streamed tokens are posted to the chat display once this many characters
+# are buffered, a newline arrives, or this many seconds have passed
+_STREAM_FLUSH_CHARS = 64
+_STREAM_FLUSH_INTERVAL = 0.05
+
+# Chat history limits: messages kept in memory, messages shown in the chat
+# display at once, and older messages restored per scroll to the top
+_MAX_STORED_MESSAGES = 1000
+_MAX_MOUNTED_MESSAGES = 50
+_HYDRATE_BATCH = 15
+
+# Number of text versions kept for undo; the oldest are discarded first
+_TEXT_STACK_SIZE = 16
+
+# Message prefix and tag color per chat role; other roles get a capitalized prefix
+# and an unconfigured tag, so they show in the chat display's default text color
+_ROLE_STYLES = {
+    "user": ("You: ", "#5E9DFF"),  # Light blue for user
+    "assistant": ("AI: ", "#50D050"),  # Green for AI
+    "error": ("Error: ", "#FF5050"),  # Red for errors
+    "status": ("", "#AAAAAA"),  # No prefix, gray for status
+    "system": ("System: ", "#E0E060")  # Yellow for system messages
+}
+
+def _make_preview(text):
+    """Return the one-line paste preview shown for a text version."""
+    # Only strip a short prefix rather than copying the whole text
+    head = text[:200].strip() or text.strip()
+    preview_text = head[:60].replace('\n', ' ')  # Show first 60 chars, no newlines
+    if len(text) > 60:
+        preview_text += "..."
+    return preview_text
+
+def _select_pasted_text(text):
+    """
+    Select exactly the just-pasted text by holding Shift and pressing Left once per character
+    ("\r\n" counts as one caret step). Selecting by line would also take in text before the
+    paste point, and Up moves by visual line in soft-wrapping editors.
+    On Windows all key events are sent in one batch; elsewhere, or if SendInput injected nothing,
+    they go through the keyboard module. A partly injected batch raises OSError instead of being replayed.
+    """
+    steps = len(text) - text.count("\r\n")
+    keys = [(win_api.VK_SHIFT, False)]
+    for _ in range(steps):
+        keys.append((win_api.VK_LEFT, False))
+        keys.append((win_api.VK_LEFT, True))
+    keys.append((win_api.VK_SHIFT, True))
+    if win_api.send_key_batch(keys):
+        return
+    
+    keyboard.press('shift')
+    try:
+        for _ in range(steps):
+            keyboard.press_and_release('left')
+    finally:
+        keyboard.release('shift')
+
+def _wait_for_active_window(window, timeout=0.5):
+    """
+    Wait until window is the active window, polling every 5 ms for at most timeout seconds.
+    Without pygetwindow the full timeout is waited.
+    """
+    if gw is None:
+        time.sleep(timeout)
+        return
+    
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if gw.getActiveWindow() == window:
+                return
+        except Exception as e:
+            logger.debug(f"Error checking active window: {e}")
+        time.sleep(0.005)
+    logger.warning("Timed out waiting for the source window to activate")
+
+@dataclass
+class MessageData:
+    """A chat message as kept in the chat window's message history."""
+    role: str
+    text: str  # Displayed text, including the role prefix
+    id: str
+    ts: float = field(default_factory=time.time)
+
+class _ClipboardSwap:
+    """
+    Context manager that temporarily places text on the clipboard using Tk's
+    in-process clipboard commands. On exit, the original clipboard content is
+    restored after a delay, unless the clipboard was changed in the meantime.
+    """
+    
+    RESTORE_DELAY_MS = 10000
+    
+    def __init__(self, widget, text_content):
+        """
+        Initialize the clipboard swap.
+        
+        Args:
+            widget: Tk widget used to access the clipboard.
+            text_content (str): The text to place on the clipboard.
+        """
+        self.widget = widget
+        self.text_content = text_content
+        self.original_content = None
+    
+    def __enter__(self):
+        try:
+            self.original_content = self.widget.clipboard_get()
+        except tk.TclError:
+            self.original_content = None  # Clipboard empty or not text
+        self.widget.clipboard_clear()
+        self.widget.clipboard_append(self.text_content)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Schedule on the root window, so it still runs if the widget is destroyed in the meantime
+        self.widget.master.after(self.RESTORE_DELAY_MS, self._restore)
+        return False
+    
+    def _restore(self):
+        """Restore the original clipboard content if it still holds the text we wrote."""
+        try:
+            try:
+                current = self.widget.master.clipboard_get()
+            except tk.TclError:
+                current = None
+            if current == self.text_content:
+                self.widget.master.clipboard_clear()
+                if self.original_content is not None:
+                    self.widget.master.clipboard_append(self.original_content)
+                logger.info("Original clipboard content restored after timeout")
+        except Exception as e:
+            logger.error(f"Error restoring clipboard: {e}")
+
+def _text_digest(text):
+    """Return a short digest of text, used to compare text versions cheaply."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def _conversation_digest(*parts):
+    """Return a short digest identifying a conversation state."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+    return digest.digest()
+
+def _get_cached_response(key):
+    """Return the cached response for key (marking it recently used), or None."""
+    with _response_cache_lock:
+        response = _response_cache.get(key)
+        if response is not None:
+            _response_cache.move_to_end(key)
+        return response
+
+def _cache_response(key, response):
+    """Store a response, evicting the least recently used entry when full."""
+    with _response_cache_lock:
+        _response_cache[key] = response
+        _response_cache.move_to_end(key)
+        if len(_response_cache) > _RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
 class ChatWindow(ctk.CTkToplevel):
     """
     Popup chat window for the SnipAI application.
@@ -35,11 +243,25 @@ class ChatWindow(ctk.CTkToplevel):
         
         self.initial_text = initial_text
         self.llm_service = llm_service
-        # Stack to store original and enhanced texts
-        self.text_stack = [self.initial_text]  # Initialize stack with original text
+        # This window's own conversation; the models and connection pool stay shared
+        self.chat_session = llm_service.new_session()
+        # Bounded stack of (preview, text, digest) entries for the original and enhanced texts
+        self.text_stack = deque(maxlen=_TEXT_STACK_SIZE)
+        self._push_text(self.initial_text)
         self.enhanced_content = self.initial_text  # Start with initial text
         self.source_window = source_window  # Store the source window reference
         self._paste_button_flash_timer = None  # Add timer tracker
+        self._msg_counter = 0  # Source of unique message IDs
+        self._assistant_count = 0  # Number of final AI responses shown (streamed partial text doesn't count)
+        self._conversation_key = b""  # Digest of the conversation so far, used for response caching
+        self._stream_message_id = None  # Chat message receiving streamed tokens, if any
+        self._stream_buffer = []  # Tokens not yet posted to the chat display (LLM event loop thread only)
+        self._stream_buffer_len = 0
+        self._stream_last_flush = 0.0
+        self._edit_depth = 0  # Nesting depth of _editable() blocks on the chat display
+        self._messages = []  # MessageData history, oldest first; the source of truth for the chat display
+        self._first_mounted = 0  # Index in _messages of the oldest message shown in the chat display
+        self._scroll_pending = None  # after_idle ID of the pending scroll to the bottom, if any
         
         # Configure window
         self.title("SnipAI")
@@ -136,6 +358,12 @@ class ChatWindow(ctk.CTkToplevel):
         self.context_full.configure(state="disabled")
         self.context_full.grid_remove()  # Hide initially
         
+        # (widget to hide, widget to show, toggle icon), indexed by the new expanded state
+        self._context_states = (
+            (self.context_full, self.context_preview, "▼"),
+            (self.context_preview, self.context_full, "▲")
+        )
+        
         # Create chat display
         self.chat_display = ctk.CTkTextbox(
             self, 
@@ -148,6 +376,12 @@ class ChatWindow(ctk.CTkToplevel):
         self.chat_display.grid(row=1, column=0, sticky="nsew", padx=5, pady=(0, 0))
         self.chat_display.configure(state="disabled")
         
+        self._install_tags()
+        
+        # Restore older messages when scrolling up (MouseWheel on Windows, Button-4 on X11)
+        self.chat_display.bind("<MouseWheel>", self._on_chat_scroll)
+        self.chat_display.bind("<Button-4>", self._on_chat_scroll)
+        
         # Create input frame
         self.input_frame = ctk.CTkFrame(self, fg_color=self.bg_color, corner_radius=0)
         self.input_frame.grid(row=2, column=0, sticky="ew", padx=5, pady=5)
@@ -215,6 +449,12 @@ class ChatWindow(ctk.CTkToplevel):
             height=36
         )
         self.paste_button.grid(row=0, column=0, sticky="ew", padx=(0, 5))  # Grid layout, add padding to right
+        # Resting appearance restored after each paste button flash
+        self._paste_button_defaults = {
+            "fg_color": self.paste_button_color,
+            "hover_color": self.paste_button_hover,
+            "text": "Paste"
+        }
 
         # Create undo button
         self.undo_button = ctk.CTkButton(
@@ -274,9 +514,8 @@ class ChatWindow(ctk.CTkToplevel):
             self.geometry(f"+{x}+{y}")
             return
             
-        # Get screen dimensions
-        screen_width = pyautogui.size()[0]
-        screen_height = pyautogui.size()[1]
+        # Get screen dimensions (cached per display by Tk)
+        screen_width, screen_height = self.winfo_screenwidth(), self.winfo_screenheight()
         
         # Get window dimensions
         # Note: During __init__, the window hasn't been fully realized yet,
@@ -315,14 +554,10 @@ class ChatWindow(ctk.CTkToplevel):
         """Toggle the visibility of the full context"""
         self.is_context_expanded = not self.is_context_expanded
         
-        if self.is_context_expanded:
-            self.context_preview.grid_remove()  # Hide preview
-            self.context_full.grid()  # Show full context
-            self.toggle_button.configure(text="▲")  # Change toggle icon
-        else:
-            self.context_full.grid_remove()  # Hide full context
-            self.context_preview.grid()  # Show preview
-            self.toggle_button.configure(text="▼")  # Change toggle icon
+        hide, show, icon = self._context_states[self.is_context_expanded]
+        hide.grid_remove()
+        show.grid()
+        self.toggle_button.configure(text=icon)  # Change toggle icon
     
     def _send_message_event(self, event=None):
         """
@@ -351,75 +586,119 @@ class ChatWindow(ctk.CTkToplevel):
         self.enhanced_content = None
         
         # Check if this is the first message
-        if self.chat_display.get("1.0", "end").count("AI:") == 0:
+        if self._assistant_count == 0:
             # This is the first user message, include context
-            threading.Thread(
-                target=self._get_initial_response,
-                args=(user_text,),
-                daemon=True
-            ).start()
+            request = self._get_initial_response(user_text)
         else:
             # Regular follow-up message
-            threading.Thread(
-                target=self._get_ai_response,
-                args=(user_text,),
-                daemon=True
-            ).start()
-    
-    def _get_initial_response(self, user_text):
-        """Get the initial response from the LLM in a separate thread with context."""
+            request = self._get_ai_response(user_text)
+        asyncio.run_coroutine_threadsafe(request, event_loop.get_event_loop())
+    
+    async def _get_initial_response(self, user_text):
+        """Get the initial response from the LLM on the background event loop with context."""
         try:
             # Create the initial conversation with both the selected text and the user's first question
-            initial_prompt = f"""Selected text:
-```
-{self.initial_text}
-```
-User question: {user_text}
-
-If the user is requesting to enhance, modify, or transform the text in any way,
-include a JSON block with the enhanced content in the following format:
-```json
-{{"enhanced_content": "The enhanced text goes here"}}
-```
-Only include this JSON block if the user explicitly asks for text enhancement, rewriting, etc."""
+            initial_prompt = _INITIAL_PROMPT_TEMPLATE % {"text": self.initial_text, "question": user_text} + _ENHANCE_INSTRUCTION
             
             # Initialize the conversation with both context and question
-            self.llm_service.memory.clear()  # Make sure memory is clear
-            ai_response = self.llm_service.invoke_chain(initial_prompt)
+            self.chat_session.clear_history()  # Make sure the history is clear
+            self._conversation_key = b""
+            ai_response = await self._invoke_llm(initial_prompt)
             
             # Check for enhanced content in the response
             cleaned_text, enhanced_content = self._extract_enhanced_content(ai_response)
             
             # Update the GUI with the response
-            self.after(0, self._update_gui_from_thread, cleaned_text, "assistant", enhanced_content)
+            self.after(0, self._finish_stream, cleaned_text, "assistant", enhanced_content)
         except Exception as e:
             error_message = f"Error getting response: {str(e)}"
             logger.error(error_message)
-            self.after(0, self._update_gui_from_thread, error_message, "error")
+            self.after(0, self._finish_stream, error_message, "error")
     
-    def _get_ai_response(self, user_text):
-        """Get AI response for follow-up messages."""
+    async def _get_ai_response(self, user_text):
+        """Get AI response for follow-up messages on the background event loop."""
         try:
             # Add instruction to include enhanced content if requested
-            full_prompt = f"""{user_text}
-
-If the user is requesting to enhance, modify, or transform text in any way,
-include a JSON block with the enhanced content in the following format:
-```json
-{{"enhanced_content": "The enhanced text goes here"}}
-```
-Only include this JSON block if the user explicitly asks for text enhancement, rewriting, etc."""
+            full_prompt = user_text + _ENHANCE_INSTRUCTION
             
-            ai_response = self.llm_service.invoke_chain(full_prompt)
+            ai_response = await self._invoke_llm(full_prompt)
             
             # Check for enhanced content in the response
             cleaned_text, enhanced_content = self._extract_enhanced_content(ai_response)
             
-            self.after(0, self._update_gui_from_thread, cleaned_text, "assistant", enhanced_content)
+            self.after(0, self._finish_stream, cleaned_text, "assistant", enhanced_content)
         except Exception as e:
             error_message = f"Error getting response: {str(e)}"
             logger.error(error_message)
-            self.after(0, self._update_gui_from_thread, error_message, "error")
+            self.after(0, self._finish_stream, error_message, "error")
+    
+    async def _invoke_llm(self, prompt):
+        """
+        Send a prompt to the LLM service, reusing a cached response when the same
+        prompt was already answered at the same point of an identical conversation.
+        Runs on the background event loop; streamed tokens are posted to the chat display.
+        
+        Args:
+            prompt (str): The full prompt to send.
+            
+        Returns:
+            str: AI response text.
+        """
+        key = _conversation_digest(self._conversation_key, prompt)
+        ai_response = _get_cached_response(key)
+        
+        if ai_response is not None:
+            logger.info("Using cached LLM response")
+            # Keep the service history in step with the conversation
+            self.chat_session.add_exchange(prompt, ai_response)
+        else:
+            self._stream_buffer = []
+            self._stream_buffer_len = 0
+            self._stream_last_flush = time.monotonic()
+            ai_response = await self.chat_session.ainvoke_chain(prompt, self._buffer_stream_token)
+            if ai_response.startswith(_LLM_ERROR_PREFIXES):
+                return ai_response
+            _cache_response(key, ai_response)
+        
+        # Advance the conversation state with this exchange
+        self._conversation_key = _conversation_digest(key, ai_response)
+        return ai_response
+    
+    def _buffer_stream_token(self, token):
+        """Collect a streamed token and post buffered tokens to the chat display in batches (event loop thread)."""
+        self._stream_buffer.append(token)
+        self._stream_buffer_len += len(token)
+        
+        now = time.monotonic()
+        if (self._stream_buffer_len >= _STREAM_FLUSH_CHARS or "\n" in token
+                or now - self._stream_last_flush >= _STREAM_FLUSH_INTERVAL):
+            self.after(0, self._stream_append, "".join(self._stream_buffer))
+            self._stream_buffer = []
+            self._stream_buffer_len = 0
+            self._stream_last_flush = now
+    
+    def _stream_append(self, text):
+        """Append streamed text to the AI message being generated, replacing the "Thinking..." status first."""
+        with self._editable():
+            if self._stream_message_id is None:
+                self._remove_last_message()
+                self._stream_message_id = self._append_to_chat_with_id(text, "assistant")
+                return
+            
+            self.chat_display.insert("end", text, ("assistant", self._stream_message_id))
+            self.chat_display.mark_set(f"{self._stream_message_id}_e", "end-1c")
+            self._messages[self._find_message(self._stream_message_id)].text += text
+        self._schedule_scroll()
+    
+    def _finish_stream(self, message, role, enhanced_content=None):
+        """Replace the streamed text (or the "Thinking..." status) with the final message."""
+        with self._editable():
+            if self._stream_message_id is not None:
+                self._remove_message_by_id(self._stream_message_id)
+                self._stream_message_id = None
+                self._update_gui_from_thread(message, role, enhanced_content, status_shown=False)
+            else:
+                self._update_gui_from_thread(message, role, enhanced_content)
     
     def _extract_enhanced_content(self, text):
         """
@@ -427,23 +706,32 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
         Returns a tuple of (cleaned_text, enhanced_content).
         """
         try:
-            # Look for JSON pattern with enhanced_content
-            json_pattern = r'```json\s*({.*?"enhanced_content"\s*:.*?})\s*```'
-            matches = re.search(json_pattern, text, re.DOTALL)
-            
-            if matches:
-                json_str = matches.group(1)
-                data = json.loads(json_str)
-                if "enhanced_content" in data:
+            # Scan for ```json fences instead of running a backtracking regex
+            search_from = 0
+            while True:
+                start = text.find(_JSON_FENCE, search_from)
+                if start < 0:
+                    break
+                block_start = start + len(_JSON_FENCE)
+                end = text.find(_FENCE, block_start)
+                if end < 0:
+                    break
+                search_from = end + len(_FENCE)
+                
+                block = text[block_start:end].strip()
+                if '"enhanced_content"' not in block:
+                    continue
+                data = json.loads(block)
+                if isinstance(data, dict) and "enhanced_content" in data:
                     # Get the enhanced content
                     enhanced_content = data["enhanced_content"]
                     logger.info(f"Enhanced content found in response: {len(enhanced_content)} characters")
                     
                     # Clean up the display text by removing the JSON block
-                    cleaned_text = re.sub(json_pattern, '', text, flags=re.DOTALL).strip()
+                    cleaned_text = (text[:start] + text[search_from:]).strip()
                     
                     # Fix any double newlines created by removing the JSON block
-                    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
+                    cleaned_text = _MULTI_NL_RE.sub('\n\n', cleaned_text)
                     
                     return cleaned_text, enhanced_content
         
@@ -453,34 +741,41 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
         # If no enhanced content or error, return original text and None
         return text, None
     
-    def _update_gui_from_thread(self, message, role, enhanced_content=None):
+    def _update_gui_from_thread(self, message, role, enhanced_content=None, status_shown=True):
         """Update the GUI from a thread via after() method."""
-        # Remove the "Thinking..." message
-        self._remove_last_message()
-        
-        # Check if the message is a categorized error
-        if role == "assistant" and message.startswith(("API_KEY_ERROR:", "CONNECTION_ERROR:", "NO_RESPONSE_ERROR:")):
-            # Extract error type and message
-            error_parts = message.split(":", 1)
-            error_type = error_parts[0].replace("_", " ")
-            error_message = error_parts[1].strip() if len(error_parts) > 1 else "Unknown error"
-            
-            # Display as error with appropriate icon and styling
-            self._append_to_chat(f"⚠️ {error_type}", "error_title")
-            self._append_to_chat(error_message, "error")
+        prefix, separator, rest = message.partition(":")
+        is_categorized_error = role == "assistant" and separator and prefix in _ERROR_PREFIXES
+        
+        # Replace the "Thinking..." message with the response in a single edit of the chat display
+        with self._editable():
+            if status_shown:
+                self._remove_last_message()
             
+            # Check if the message is a categorized error
+            if is_categorized_error:
+                # Extract error type and message
+                error_type = _ERROR_DISPLAY[prefix]
+                error_message = rest.strip() or "Unknown error"
+                
+                # Display as error with appropriate icon and styling
+                self._append_to_chat(f"⚠️ {error_type}", "error_title")
+                self._append_to_chat(error_message, "error")
+            else:
+                # Display the new message normally
+                self._append_to_chat(message, role)
+                # Only replies that made it into the conversation history end the first turn
+                if role == "assistant" and not message.startswith(_LLM_ERROR_PREFIXES):
+                    self._assistant_count += 1
+        
+        if is_categorized_error:
             # Re-enable input
             self._set_input_state("normal")
             return
         
-        # Display the new message normally
-        self._append_to_chat(message, role)
-        
         # Save enhanced content if present
         if enhanced_content:
             # Add new enhanced content to stack if it's different from the current content
-            if enhanced_content != self.enhanced_content:
-                self.text_stack.append(enhanced_content)
+            if self._push_text(enhanced_content):
                 self.undo_button.configure(state="normal")
                 logger.info("Undo button enabled (new enhanced content added)")
             
@@ -496,6 +791,22 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
         if role != "error":
             self._set_input_state("normal")
     
+    def _push_text(self, text):
+        """
+        Push a text version onto the undo stack unless it matches the current top.
+        
+        Args:
+            text (str): The text version to push.
+            
+        Returns:
+            bool: True if the text was pushed, False if it was already at the top.
+        """
+        digest = _text_digest(text)
+        if self.text_stack and self.text_stack[-1][2] == digest:
+            return False
+        self.text_stack.append((_make_preview(text), text, digest))
+        return True
+    
     def _undo_action(self):
         """Reverts the enhanced_content to the previous version in stack and selects it in the source window."""
         if len(self.text_stack) > 1:
@@ -503,7 +814,7 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
             self.text_stack.pop()  
             
             # Set the enhanced content to previous version
-            self.enhanced_content = self.text_stack[-1]
+            self.enhanced_content = self.text_stack[-1][1]
             logger.info(f"Undo action: Reverted to previous content in stack")
 
             # Update the preview label
@@ -517,85 +828,77 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
             # Apply the undone text to the source window with selection
             self._apply_text_to_source_window(self.enhanced_content, "Undone")
     
-    def _apply_text_to_source_window(self, text_content, action_name="Pasted"):
-        """Apply text to source window and select it, used by both paste and undo operations."""
+    def _apply_text_to_source_window(self, text_content, action_name="Pasted", on_success=None):
+        """
+        Apply text to source window and select it, used by both paste and undo operations.
+        The window switch and keystrokes run on a worker thread so the GUI stays responsive.
+        
+        Args:
+            text_content (str): The text to paste into the source window.
+            action_name (str): Name of the action, used in status and log messages.
+            on_success (callable, optional): Called on the GUI thread with text_content
+                once the text has been applied.
+                
+        Returns:
+            bool: True if the operation was started, False if there was nothing to apply.
+        """
         if not text_content:
             return False
         
+        threading.Thread(
+            target=self._apply_text_to_source_window_worker,
+            args=(text_content, action_name, on_success),
+            daemon=True
+        ).start()
+        return True
+    
+    def _apply_text_to_source_window_worker(self, text_content, action_name, on_success=None):
+        """Switch to the source window, paste and select the text (runs in a separate thread)."""
         try:
-            # Save original clipboard content
-            original_content = pyperclip.paste()
-            
-            # Set new content to clipboard
-            pyperclip.copy(text_content)
-            
-            # Calculate the number of characters for selection
-            content_length = len(text_content)
-            
             # Check if we have a valid source window reference
-            if self.source_window:
-                try:
-                    # Get current active window for later restoration
-                    import pygetwindow as gw
-                    current_window = gw.getActiveWindow()
-                    
-                    # Try to activate the source window
-                    self.source_window.activate()
-                    
-                    # Give time for window to activate
-                    time.sleep(0.5)
-                    
-                    # Paste the content
-                    keyboard.press_and_release('ctrl+v')
-                    
-                    # Give time for paste operation to complete
-                    time.sleep(0.3)
-                    
-                    # Select the pasted text by using Shift+Left arrows
-                    keyboard.press('shift')
-                    for _ in range(min(content_length, 1000)):  # Limit to 1000 keystrokes for very long content
-                        keyboard.press_and_release('left')
-                        time.sleep(0.001)  # Small delay between keypresses
-                    keyboard.release('shift')
-                    
-                    # Return focus to our window after a brief delay
-                    time.sleep(0.5)
-                    if current_window:
-                        current_window.activate()
-                    
-                    # Show success via button only (no chat message)
-                    self._flash_paste_button_success(f"Content {action_name} Successfully!")
-                    
-                    # Set a timer to restore clipboard after 10 seconds
-                    def restore_clipboard():
-                        try:
-                            current = pyperclip.paste()
-                            if current == text_content:
-                                pyperclip.copy(original_content)
-                                logger.info("Original clipboard content restored after timeout")
-                        except Exception as e:
-                            logger.error(f"Error restoring clipboard: {e}")
-                    
-                    threading.Timer(10.0, restore_clipboard).start()
-                    return True
-                    
-                except Exception as e:
-                    logger.error(f"Error during {action_name.lower()} operation: {e}")
-                    return False
-            else:
-                # No source window reference
+            if not self.source_window:
+                # No source window reference, leave the text on the clipboard
+                self.clipboard_clear()
+                self.clipboard_append(text_content)
                 return False
+            
+            with _ClipboardSwap(self, text_content):
+                # Get current active window for later restoration
+                current_window = gw.getActiveWindow() if gw else None
+                
+                # Try to activate the source window
+                self.source_window.activate()
+                
+                # Wait until the window has actually been activated
+                _wait_for_active_window(self.source_window)
+                
+                # Paste the content
+                keyboard.press_and_release('ctrl+v')
+                
+                # Give time for paste operation to complete
+                time.sleep(0.3)
+                
+                # Select the pasted text character by character
+                _select_pasted_text(text_content)
+                
+                # Return focus to our window after a brief delay
+                time.sleep(0.5)
+                if current_window:
+                    current_window.activate()
+            
+            # Show success via button only (no chat message)
+            self.after(0, self._flash_paste_button_success, f"Content {action_name} Successfully!")
+            if on_success:
+                self.after(0, on_success, text_content)
+            return True
                 
         except Exception as e:
             logger.error(f"Error during {action_name.lower()} operation: {e}")
             return False
     
     def _update_paste_preview(self):
-        """Updates the paste preview label with the current enhanced_content."""
-        preview_text = self.enhanced_content.strip().replace('\n', ' ')[:60]  # Show first 60 chars, no newlines
-        if len(self.enhanced_content) > 60:
-            preview_text += "..."
-        self.paste_preview.configure(text=f"Paste: {preview_text}")
+        """Updates the paste preview label with the precomputed preview of the current text."""
+        self.paste_preview.configure(text=f"Paste: {self.text_stack[-1][0]}")
 
     def _paste_enhanced_content(self):
         """Paste the enhanced content by switching to source window and select after pasting."""
@@ -606,208 +909,218 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
             return
             
         # Apply the content to the source window
-        paste_successful = self._apply_text_to_source_window(self.enhanced_content)
-        
-        if paste_successful:
-            # Add content to stack if successful paste and if it's not already at the top of the stack
-            if self.text_stack[-1] != self.enhanced_content:
-                self.text_stack.append(self.enhanced_content)
-                
-            # Always enable the undo button if we have more than one item in stack
-            if len(self.text_stack) > 1:
-                self.undo_button.configure(
-                    state="normal",
-                    fg_color=self.undo_button_color,
-                    hover_color=self.undo_button_hover
-                )
-                logger.info("Undo button enabled (content pasted successfully)")
+        self._apply_text_to_source_window(self.enhanced_content, on_success=self._on_paste_success)
+    
+    def _on_paste_success(self, pasted_content):
+        """Update the text stack and undo button after a successful paste."""
+        # Add content to stack if it's not already at the top of the stack
+        self._push_text(pasted_content)
             
-            # Update the preview in case we added the content to the stack
-            self._update_paste_preview()
+        # Always enable the undo button if we have more than one item in stack
+        if len(self.text_stack) > 1:
+            self.undo_button.configure(
+                state="normal",
+                fg_color=self.undo_button_color,
+                hover_color=self.undo_button_hover
+            )
+            logger.info("Undo button enabled (content pasted successfully)")
+        
+        # Update the preview in case we added the content to the stack
+        self._update_paste_preview()
     
-    def _flash_paste_button_success(self, message="Content Pasted Successfully!"):
+    def _flash_paste_button(self, color, hover_color, text):
         """
-        Change the paste button appearance to indicate successful paste.
+        Temporarily change the paste button appearance to show a status message.
         Ensures only one flash timer runs at a time.
         """
+        # The paste worker posts its flash when it finishes, which may be after the window was closed
+        if not self.winfo_exists():
+            return
+        
         # Cancel any existing timer
         if self._paste_button_flash_timer:
             self.after_cancel(self._paste_button_flash_timer)
             self._paste_button_flash_timer = None
-            
-        # Save original colors, text and state
-        original_color = self.paste_button.cget("fg_color")
-        original_hover = self.paste_button.cget("hover_color")
-        original_text = self.paste_button.cget("text")
-        
-        # Change to success color and disable button
-        success_color = "#50A050"  # Green color
-        success_hover = "#408040"
-        self.paste_button.configure(
-            fg_color=success_color,
-            hover_color=success_hover,
-            text=message,
-            state="disabled"  # Disable button while showing message
+        
+        # Change to the flash color and disable button while showing message
+        button = self.paste_button
+        defaults = self._paste_button_defaults
+        button.configure(
+            fg_color=color,
+            hover_color=hover_color,
+            text=text,
+            state="disabled"
         )
         
-        # Schedule revert after exactly 1.2 seconds
         def revert_button():
-            if hasattr(self, 'paste_button') and self.paste_button.winfo_exists():
-                self.paste_button.configure(
-                    fg_color=original_color,
-                    hover_color=original_hover,
-                    text=original_text,
-                    state="normal"  # Re-enable button
-                )
+            # The timer is cancelled in on_close, so the button still exists here
+            button.configure(**defaults, state="normal")
             self._paste_button_flash_timer = None # Clear timer ID
-            
-        self._paste_button_flash_timer = self.after(1200, revert_button)  # 1200ms = 1.2 seconds
-    
-    def _flash_paste_button_ready(self, message_text="Content Ready! Click where you want to paste"):
-        """
-        Change the paste button appearance to indicate content is ready to paste.
-        Ensures only one flash timer runs at a time.
-        """
-        # Cancel any existing timer
-        if self._paste_button_flash_timer:
-            self.after_cancel(self._paste_button_flash_timer)
-            self._paste_button_flash_timer = None
-            
-        # Save original colors and state
-        original_color = self.paste_button.cget("fg_color")
-        original_hover = self.paste_button.cget("hover_color")
-        original_text = self.paste_button.cget("text")
-        
-        # Change to ready color and disable button
-        ready_color = "#4A90E2"  # Blue color
-        ready_hover = "#3A80D2"
-        self.paste_button.configure(
-            fg_color=ready_color,
-            hover_color=ready_hover,
-            text=message_text,
-            state="disabled"  # Disable button while showing message
-        )
         
         # Schedule revert after exactly 1.2 seconds
-        def revert_button():
-            if hasattr(self, 'paste_button') and self.paste_button.winfo_exists():
-                self.paste_button.configure(
-                    fg_color=original_color,
-                    hover_color=original_hover,
-                    text=original_text,
-                    state="normal"  # Re-enable button
-                )
-            self._paste_button_flash_timer = None # Clear timer ID
-            
         self._paste_button_flash_timer = self.after(1200, revert_button)  # 1200ms = 1.2 seconds
     
+    def _flash_paste_button_success(self, message="Content Pasted Successfully!"):
+        """Change the paste button appearance to indicate successful paste."""
+        self._flash_paste_button("#50A050", "#408040", message)  # Green color
+    
+    def _flash_paste_button_ready(self, message_text="Content Ready! Click where you want to paste"):
+        """Change the paste button appearance to indicate content is ready to paste."""
+        self._flash_paste_button("#4A90E2", "#3A80D2", message_text)  # Blue color
+    
     def _flash_paste_button_info(self, message, duration=None):
         """
         Flash the paste button with an informational message for exactly 1.2 seconds.
-        Ensures only one flash timer runs at a time.
+        The duration parameter is ignored.
         """
-        # Cancel any existing timer
-        if self._paste_button_flash_timer:
-            self.after_cancel(self._paste_button_flash_timer)
-            self._paste_button_flash_timer = None
-            
-        # Save original colors, text and state
-        original_color = self.paste_button.cget("fg_color")
-        original_hover = self.paste_button.cget("hover_color")
-        original_text = self.paste_button.cget("text")
-        
-        # Change to info color and disable button
-        info_color = "#E0E060"  # Yellow color
-        info_hover = "#D0D050"
-        self.paste_button.configure(
-            fg_color=info_color,
-            hover_color=info_hover,
-            text=message,
-            state="disabled"  # Disable button while showing message
-        )
-        
-        # Schedule revert after exactly 1.2 seconds, ignoring the duration parameter
-        def revert_button():
-            if hasattr(self, 'paste_button') and self.paste_button.winfo_exists():
-                self.paste_button.configure(
-                    fg_color=original_color,
-                    hover_color=original_hover,
-                    text=original_text,
-                    state="normal"  # Re-enable button
-                )
-            self._paste_button_flash_timer = None # Clear timer ID
-            
-        self._paste_button_flash_timer = self.after(1200, revert_button)  # Always 1200ms (1.2 seconds)
+        self._flash_paste_button("#E0E060", "#D0D050", message)  # Yellow color
     
-    def _remove_message_by_id_if_exists(self, message_id):
-        """Remove a message by ID if it exists"""
-        if message_id:
-            self._remove_message_by_id(message_id)
-    
-    def _append_to_chat_with_id(self, message, role):
+    def _append(self, message, role, *, track=False):
         """
-        Append a message to the chat display with styling and return a unique ID for this message.
-        This allows for selective removal later.
+        Append a message to the chat display with styling.
         
         Args:
             message (str): The message to append.
             role (str): The role of the message sender.
+            track (bool): Whether the caller wants the message ID for selective removal later.
             
         Returns:
-            str: A unique ID for this message to allow removal later.
+            str or None: The unique ID of the message if track is set, otherwise None.
         """
         # Create a unique ID for this message
-        message_id = f"msg_{time.time()}_{id(message)}"
-        self._last_message_id = message_id
-        
-        # Enable the text widget for editing
-        self.chat_display.configure(state="normal")
+        self._msg_counter += 1
+        message_id = f"msg_{self._msg_counter}"
+        if track:
+            self._last_message_id = message_id
         
         # Add a prefix based on the role
-        if role == "user":
-            prefix = "You: "
-            color = "#5E9DFF"  # Light blue for user
-        elif role == "assistant":
-            prefix = "AI: "
-            color = "#50D050"  # Green for AI
-        elif role == "error":
-            prefix = "Error: "
-            color = "#FF5050"  # Red for errors
-        elif role == "status":
-            prefix = ""  # No prefix for status
-            color = "#AAAAAA"  # Gray for status
-        elif role == "system":
-            prefix = "System: "
-            color = "#E0E060"  # Yellow for system messages
-        else:
-            prefix = f"{role.capitalize()}: "
-            color = self.text_color
+        prefix = _ROLE_STYLES.get(role, (f"{role.capitalize()}: ",))[0]
         
-        # Insert message with prefix
-        if self.chat_display.index('end-1c') != '1.0':  # Not the first line
-            self.chat_display.insert('end', '\n\n')
-            
-        # Store the start position of this message
-        message_start = self.chat_display.index('end-1c')
+        # Store the message, then show it
+        message_data = MessageData(role, f"{prefix}{message}", message_id)
+        self._messages.append(message_data)
         
-        # Add the message
-        self.chat_display.insert('end', f"{prefix}{message}")
-        message_end = self.chat_display.index('end-1c')
+        with self._editable():
+            self._mount_message(message_data)
+            self._prune_visible()
         
-        # Apply color to the text
-        self.chat_display.tag_add(role, message_start, message_end)
-        self.chat_display.tag_config(role, foreground=color)
+        # Scroll to the bottom
+        self._schedule_scroll()
         
-        # Also tag with the unique ID for later removal
-        self.chat_display.tag_add(message_id, message_start, message_end)
+        return message_id if track else None
+    
+    def _append_to_chat_with_id(self, message, role):
+        """Append a message to the chat display and return its unique ID for selective removal later."""
+        return self._append(message, role, track=True)
+    
+    def _mount_message(self, message_data):
+        """
+        Show a stored message at the end of the chat display.
+        Must be called inside an _editable() block.
         
-        # Disable the text widget again
-        self.chat_display.configure(state="disabled")
+        Args:
+            message_data (MessageData): The message to show.
+        """
+        # Insert message separator if other messages are shown (the new message is already stored)
+        if len(self._messages) - self._first_mounted > 1:
+            self.chat_display.insert('end', '\n\n')
         
-        # Scroll to the bottom
+        # Add the message with its role tag (color) and unique ID tag (for later removal)
+        self.chat_display.insert('end', message_data.text, (message_data.role, message_data.id))
+        self._mark_message(message_data.id)
+    
+    def _mark_message(self, message_id):
+        """
+        Set start/end marks around a shown message so it can be deleted without index lookups.
+        The start mark keeps the default right gravity (text hydrated in front of it stays outside)
+        and the end mark gets left gravity (text appended after it stays outside).
+        
+        Args:
+            message_id (str): The ID of the message, which must already be inserted with its ID tag.
+        """
+        self.chat_display.mark_set(f"{message_id}_s", f"{message_id}.first")
+        self.chat_display.mark_set(f"{message_id}_e", f"{message_id}.last")
+        self.chat_display.mark_gravity(f"{message_id}_e", "left")
+    
+    def _prune_visible(self):
+        """
+        Keep at most _MAX_MOUNTED_MESSAGES messages in the chat display by deleting the
+        oldest ones in a single call; they stay in the history and can be hydrated again.
+        Must be called inside an _editable() block.
+        """
+        # Bound the stored history as well
+        excess = len(self._messages) - _MAX_STORED_MESSAGES
+        if excess > 0:
+            del self._messages[:excess]
+            self._first_mounted = max(0, self._first_mounted - excess)
+        
+        new_first = len(self._messages) - _MAX_MOUNTED_MESSAGES
+        if new_first <= self._first_mounted:
+            return
+        
+        pruned_ids = [message.id for message in self._messages[self._first_mounted:new_first]]
+        self.chat_display.delete('1.0', f"{self._messages[new_first].id}.first")
+        self.chat_display.tag_delete(*pruned_ids)
+        self.chat_display.mark_unset(*(f"{message_id}{suffix}" for message_id in pruned_ids for suffix in ("_s", "_e")))
+        self._first_mounted = new_first
+    
+    def _install_tags(self):
+        """
+        Configure the role tags of the chat display once, when the window is built.
+        All chat tag options (color, spacing and any future font or margin settings) belong
+        here; appending messages only applies existing tags and never calls tag_config.
+        """
+        for role, (_, color) in _ROLE_STYLES.items():
+            self.chat_display.tag_config(role, foreground=color, spacing1=2, spacing3=2)
+    
+    def _schedule_scroll(self):
+        """Scroll the chat display to the bottom once the current event has been handled."""
+        # Appends within the same event collapse into a single scroll
+        if self._scroll_pending:
+            return
+        self._scroll_pending = self.after_idle(self._do_scroll)
+    
+    def _do_scroll(self):
+        """Run the pending scroll to the bottom of the chat display."""
+        self._scroll_pending = None
         self.chat_display.yview_moveto(1.0)
+    
+    def _on_chat_scroll(self, event=None):
+        """Check for hydration once the scroll event has been handled by the chat display."""
+        self.after_idle(self._check_hydration_needed)
+    
+    def _check_hydration_needed(self):
+        """Show older stored messages when the chat display is scrolled near its top."""
+        if self._first_mounted == 0 or self.chat_display.yview()[0] >= 0.1:
+            return
         
-        return message_id
+        new_first = max(0, self._first_mounted - _HYDRATE_BATCH)
+        has_following = self._first_mounted < len(self._messages)
+        
+        with self._editable():
+            # Right gravity keeps the mark after text inserted at its position
+            self.chat_display.mark_set("hydrate_anchor", "1.0")
+            for message_data in reversed(self._messages[new_first:self._first_mounted]):
+                if has_following:
+                    self.chat_display.insert("1.0", "\n\n")
+                self.chat_display.insert("1.0", message_data.text, (message_data.role, message_data.id))
+                self._mark_message(message_data.id)
+                has_following = True
+        self._first_mounted = new_first
+        
+        # Keep the previously topmost message in view
+        anchor_line = int(self.chat_display.index("hydrate_anchor").split('.')[0])
+        total_lines = int(self.chat_display.index("end-1c").split('.')[0])
+        self.chat_display.mark_unset("hydrate_anchor")
+        self.chat_display.yview_moveto((anchor_line - 1) / total_lines)
+        logger.debug(f"Hydrated chat history, {len(self._messages) - new_first} messages shown")
+    
+    def _find_message(self, message_id):
+        """Return the index of a message in the history (searching from the newest), or None."""
+        for index in range(len(self._messages) - 1, -1, -1):
+            if self._messages[index].id == message_id:
+                return index
+        return None
     
     def _remove_message_by_id(self, message_id):
         """
@@ -820,50 +1133,54 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
             return
             
         try:
-            # Enable the text widget for editing
-            self.chat_display.configure(state="normal")
+            index = self._find_message(message_id)
+            if index is None:
+                return
             
-            # Find the range of the message with this ID
-            ranges = self.chat_display.tag_ranges(message_id)
+            if index >= self._first_mounted:
+                with self._editable():
+                    # Every shown message except the first is preceded by a "\n\n" separator,
+                    # so the range to delete (message plus one separator) is known up front
+                    if index > self._first_mounted:
+                        start, end = f"{message_id}_s - 2c", f"{message_id}_e"
+                    elif index + 1 < len(self._messages):
+                        # The next message becomes the first one and loses its separator
+                        start, end = f"{message_id}_s", f"{message_id}_e + 2c"
+                    else:
+                        start, end = f"{message_id}_s", f"{message_id}_e"
+                    self.chat_display.delete(start, end)
+                    self.chat_display.mark_unset(f"{message_id}_s", f"{message_id}_e")
+            self.chat_display.tag_delete(message_id)
             
-            if ranges and len(ranges) >= 2:
-                # Get the start and end positions
-                start = ranges[0]
-                end = ranges[1]
-                
-                # Check if we need to remove preceding newlines
-                # This makes the chat flow more naturally after removal
-                prev_char_pos = self.chat_display.index(f"{start} - 1 chars")
-                next_char_pos = self.chat_display.index(f"{end} + 1 chars")
-                
-                # If preceded by newlines, remove them too
-                if self.chat_display.get(prev_char_pos, start) == "\n":
-                    start = prev_char_pos
-                
-                # If followed by newlines, remove one of them
-                if self.chat_display.get(end, next_char_pos) == "\n":
-                    end = next_char_pos
-                
-                # Delete the message
-                self.chat_display.delete(start, end)
-            
-            # Disable the text widget again
-            self.chat_display.configure(state="disabled")
+            # Drop the message from the history
+            del self._messages[index]
+            if index < self._first_mounted:
+                self._first_mounted -= 1
             
         except Exception as e:
             logger.error(f"Error removing message by ID: {e}")
     
     def _remove_last_message(self):
         """Remove the last message from the chat display (usually a status message)."""
-        self.chat_display.configure(state="normal")
-        
-        # Get the last line index
-        last_line_start = self.chat_display.index("end-1l linestart")
-        
-        # Delete the last line
-        self.chat_display.delete(last_line_start, "end")
-        
-        self.chat_display.configure(state="disabled")
+        if self._messages:
+            self._remove_message_by_id(self._messages[-1].id)
+    
+    @contextlib.contextmanager
+    def _editable(self):
+        """
+        Make the chat display writable for the duration of the block.
+        Blocks may be nested; only the outermost one toggles the widget state,
+        so a sequence of edits costs a single enable/disable pair.
+        """
+        if self._edit_depth == 0:
+            self.chat_display.configure(state="normal")
+        self._edit_depth += 1
+        try:
+            yield
+        finally:
+            self._edit_depth -= 1
+            if self._edit_depth == 0:
+                self.chat_display.configure(state="disabled")
     
     def _set_input_state(self, state):
         """
@@ -876,58 +1193,18 @@ Only include this JSON block if the user explicitly asks for text enhancement, r
         self.send_button.configure(state=state)
     
     def _append_to_chat(self, message, role):
-        """
-        Append a message to the chat display with styling.
-        
-        Args:
-            message (str): The message to append.
-            role (str): The role of the message sender.
-        """
-        # Enable the text widget for editing
-        self.chat_display.configure(state="normal")
-        
-        # Add a prefix based on the role
-        if role == "user":
-            prefix = "You: "
-            color = "#5E9DFF"  # Light blue for user
-        elif role == "assistant":
-            prefix = "AI: "
-            color = "#50D050"  # Green for AI
-        elif role == "error":
-            prefix = "Error: "
-            color = "#FF5050"  # Red for errors
-        elif role == "status":
-            prefix = ""  # No prefix for status
-            color = "#AAAAAA"  # Gray for status
-        elif role == "system":
-            prefix = "System: "
-            color = "#E0E060"  # Yellow for system messages
-        else:
-            prefix = f"{role.capitalize()}: "
-            color = self.text_color
-        
-        # Insert message with prefix
-        if self.chat_display.index('end-1c') != '1.0':  # Not the first line
-            self.chat_display.insert('end', '\n\n')
-        
-        # Add the message
-        message_start = self.chat_display.index('end-1c')
-        self.chat_display.insert('end', f"{prefix}{message}")
-        message_end = self.chat_display.index('end-1c')
-        
-        # Apply color to the text
-        self.chat_display.tag_add(role, message_start, message_end)
-        self.chat_display.tag_config(role, foreground=color)
-        
-        # Disable the text widget again
-        self.chat_display.configure(state="disabled")
-        
-        # Scroll to the bottom
-        self.chat_display.yview_moveto(1.0)
+        """Append a message to the chat display with styling."""
+        self._append(message, role)
     
     def on_close(self):
         """Handle window closing."""
         logger.info("Chat window closed")
+        if self._paste_button_flash_timer:
+            self.after_cancel(self._paste_button_flash_timer)
+            self._paste_button_flash_timer = None
+        if self._scroll_pending:
+            self.after_cancel(self._scroll_pending)
+            self._scroll_pending = None
         self.destroy()
 
 # Test function for when this module is run directly
@@ -943,8 +1220,14 @@ def test_chat_window():
     
     # Create a mock LLM service for testing
     class MockLLMService:
-        def __init__(self):
-            self.memory = type('obj', (object,), {'clear': lambda: None})
+        def new_session(self):
+            return self
+        
+        def clear_history(self):
+            pass
+        
+        def add_exchange(self, user_input, ai_response):
+            pass
             
         def invoke_chain(self, user_input):
             print(f"Mock LLM received: {user_input[:50]}...")
@@ -961,6 +1244,13 @@ def test_chat_window():
 Let me know if you need any further adjustments."""
             else:
                 return f"Mock response to your question about the selected text."
+        
+        async def ainvoke_chain(self, user_input, on_token=None):
+            response = await asyncio.get_running_loop().run_in_executor(None, self.invoke_chain, user_input)
+            if on_token is not None:
+                for word in response.split(" "):
+                    on_token(word + " ")
+            return response
     
     # Create root window (required for CTkToplevel)
     root = ctk.CTk()
@@ -6,6 +6,7 @@ import time
 import logging
 import keyboard
 import pyperclip
+import win_api
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,6 +14,21 @@ logger = logging.getLogger(__name__)
 # Store original clipboard content
 _original_clipboard = None
 
+# Placeholder written before copying so any clipboard change can be detected
+# (CF_UNICODETEXT stops at the leading NUL, so on Windows it reads back as empty)
+_COPY_SENTINEL = "\0SNIPAI_SENTINEL\0"
+# How long to wait for the copied text, and how often to check for it (seconds)
+_COPY_TIMEOUT = 0.4
+_COPY_POLL_INTERVAL = 0.01
+
+# Read and write the clipboard with direct user32 calls on Windows, pyperclip elsewhere
+if win_api.IS_WINDOWS:
+    _paste = win_api.get_clipboard_text
+    _copy = win_api.set_clipboard_text
+else:
+    _paste = pyperclip.paste
+    _copy = pyperclip.copy
+
 def _save_clipboard():
     """
     Saves the current clipboard content.
@@ -20,11 +36,11 @@ def _save_clipboard():
     """
     global _original_clipboard
     try:
-        _original_clipboard = pyperclip.paste()
+        _original_clipboard = _paste()
         logger.debug("Original clipboard content saved")
         return _original_clipboard
     except Exception as e:
-        logger.error(f"Error saving clipboard content: {str(e)}")
+        logger.error("Error saving clipboard content: %s", e)
         _original_clipboard = None
         return None
 
@@ -33,10 +49,10 @@ def _restore_clipboard():
     global _original_clipboard
     if _original_clipboard is not None:
         try:
-            pyperclip.copy(_original_clipboard)
+            _copy(_original_clipboard)
             logger.debug("Original clipboard content restored")
         except Exception as e:
-            logger.error(f"Error restoring clipboard content: {str(e)}")
+            logger.error("Error restoring clipboard content: %s", e)
         _original_clipboard = None
     else:
         logger.debug("No original clipboard content to restore")
@@ -44,8 +60,10 @@ def _restore_clipboard():
 def get_selected_text_via_copy():
     """
     Gets the currently selected text using clipboard manipulation.
-    Improved for compatibility with Microsoft Teams and other applications
-    that may handle clipboard operations differently.
+    A sentinel is placed on the clipboard before sending a single Ctrl+C, and the
+    clipboard is polled until the target application replaces it (or a short timeout passes).
+    Applications that are slow to update the clipboard (e.g. Microsoft Teams) are
+    covered by raising _COPY_TIMEOUT, not by retrying the copy with longer sleeps.
     
     Returns:
         str or None: The selected text or None if no text was selected.
@@ -56,54 +74,33 @@ def get_selected_text_via_copy():
     try:
         # Save the original clipboard content
         original_content = _save_clipboard()
-        logger.debug(f"Original clipboard content length: {len(original_content) if original_content else 0} characters")
+        logger.debug("Original clipboard content length: %d characters", len(original_content) if original_content else 0)
+        if original_content is None:
+            # Never leave the sentinel behind if the original content couldn't be read
+            _original_clipboard = ""
         
         try:
-            # Try multiple approaches to copy text, starting with the standard approach
-            methods = [
-                # Method 1: Standard Ctrl+C
-                lambda: keyboard.press_and_release('ctrl+c'),
-                
-                # Method 2: Press and hold approach
-                lambda: (keyboard.press('ctrl'), 
-                         time.sleep(0.1), 
-                         keyboard.press('c'), 
-                         time.sleep(0.1), 
-                         keyboard.release('c'), 
-                         time.sleep(0.1),
-                         keyboard.release('ctrl')),
-                
-                # Method 3: Teams-specific (Ctrl+C with longer delay)
-                lambda: (keyboard.press_and_release('ctrl+c'),
-                         time.sleep(0.5))  # Teams might need a longer delay
-            ]
+            # Any change away from the sentinel is the copied selection, even if it
+            # matches the original clipboard content
+            _copy(_COPY_SENTINEL)
+            keyboard.send('ctrl+c')
             
-            # Try each method until we get something different from original clipboard
-            for i, method in enumerate(methods):
-                logger.debug(f"Trying copy method {i+1}")
-                
-                # Execute the copy method to replicate the data
-                # Execute the copy method
-                method()
-                
-                # Allow some time for the clipboard to update
-                time.sleep(0.3)
-                
-                # Get clipboard content
-                current_content = pyperclip.paste()
-                
-                # Check if we got some text and it's different from original
-                if current_content and current_content != original_content:
+            # Poll until the clipboard changes instead of sleeping a fixed time
+            deadline = time.monotonic() + _COPY_TIMEOUT
+            while time.monotonic() < deadline:
+                current_content = _paste()
+                if current_content and current_content != _COPY_SENTINEL:
                     selected_text = current_content
-                    logger.info(f"Copy method {i+1} succeeded, got {len(selected_text)} characters")
+                    logger.info("Copy succeeded, got %d characters", len(selected_text))
                     break
+                time.sleep(_COPY_POLL_INTERVAL)
             
-            # If all methods failed, log it
+            # If the clipboard never changed, log it
             if selected_text is None:
-                logger.info("All copy methods failed, no text was selected or app doesn't support clipboard copy")
+                logger.info("Copy failed, no text was selected or app doesn't support clipboard copy")
                 
         except Exception as e:
-            logger.error(f"Error during copy simulation: {str(e)}")
+            logger.error("Error during copy simulation: %s", e)
             selected_text = None
             
     finally:
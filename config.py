@@ -5,6 +5,7 @@ Loads and provides configuration values.
 import os
 import logging
 import sys
+import enum
 import json  # Import json module
 
 # Determine application path
@@ -27,102 +28,144 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --- Configuration Loading Logic ---
-_config_cache = None  # Initialize as None to indicate not loaded
-_config_loaded_successfully = False
-
 CONFIG_FILENAME = "config.json"
 EXPECTED_KEYS = ["GROQ_API_KEY", "SNIPAI_HOTKEY"]
 
-def _load_config():
+def _load_from_disk():
     """
     Loads configuration strictly from config.json.
+    Returns the configuration dict if successful, None otherwise.
+    """
+    config_file_path = os.path.join(application_path, CONFIG_FILENAME)
+    logger.info(f"Attempting to load configuration from: {config_file_path}")
+
+    try:
+        with open(config_file_path, 'r') as f:
+            loaded_config = json.load(f)
+        logger.info(f"Successfully loaded configuration from {config_file_path}")
+
+        # Validate essential keys
+        missing_keys = [key for key in EXPECTED_KEYS if key not in loaded_config or not loaded_config[key]]
+        if missing_keys:
+            logger.error(f"Missing or empty essential keys in {config_file_path}: {', '.join(missing_keys)}")
+            return None
+
+        return loaded_config
+
+    except FileNotFoundError:
+        logger.error(f"CRITICAL: Configuration file '{config_file_path}' not found.")
+        logger.error(f"Please create '{CONFIG_FILENAME}' in the application directory with keys: {', '.join(EXPECTED_KEYS)}")
+        return None
+    except json.JSONDecodeError as e:
+        logger.error(f"CRITICAL: Error decoding JSON from {config_file_path}: {e}")
+        logger.error(f"Please ensure '{CONFIG_FILENAME}' is valid JSON.")
+        return None
+    except Exception as e:
+        logger.error(f"CRITICAL: Unexpected error loading {config_file_path}: {e}")
+        return None
+
+class _State(enum.IntEnum):
+    """Load state of the configuration."""
+    UNLOADED = 0
+    LOADED = 1
+    FAILED = 2
+
+_STATE = _State.UNLOADED
+_DATA: dict = {}  # Validated configuration values, empty unless _STATE is LOADED
+
+def _load_config():
+    """
+    Loads config.json into _DATA and records the outcome in _STATE.
     Returns True if successful, False otherwise.
-    Populates _config_cache on success.
     """
-    global _config_cache, _config_loaded_successfully
-    if _config_loaded_successfully:  # If already loaded successfully, return True
-        return True
-    if _config_cache is not False:  # If loading hasn't failed definitively yet
-        config_file_path = os.path.join(application_path, CONFIG_FILENAME)
-        logger.info(f"Attempting to load configuration from: {config_file_path}")
-
-        try:
-            with open(config_file_path, 'r') as f:
-                _config_cache = json.load(f)
-            logger.info(f"Successfully loaded configuration from {config_file_path}")
-
-            # Validate essential keys
-            missing_keys = [key for key in EXPECTED_KEYS if key not in _config_cache or not _config_cache[key]]
-            if missing_keys:
-                logger.error(f"Missing or empty essential keys in {config_file_path}: {', '.join(missing_keys)}")
-                _config_cache = False  # Mark loading as failed
-                return False
-
-            _config_loaded_successfully = True
-            return True
-
-        except FileNotFoundError:
-            logger.error(f"CRITICAL: Configuration file '{config_file_path}' not found.")
-            logger.error(f"Please create '{CONFIG_FILENAME}' in the application directory with keys: {', '.join(EXPECTED_KEYS)}")
-            _config_cache = False  # Mark loading as failed
-            return False
-        except json.JSONDecodeError as e:
-            logger.error(f"CRITICAL: Error decoding JSON from {config_file_path}: {e}")
-            logger.error(f"Please ensure '{CONFIG_FILENAME}' is valid JSON.")
-            _config_cache = False  # Mark loading as failed
-            return False
-        except Exception as e:
-            logger.error(f"CRITICAL: Unexpected error loading {config_file_path}: {e}")
-            _config_cache = False  # Mark loading as failed
-            return False
-    else:  # Loading previously failed
+    global _STATE, _DATA
+    loaded_config = _load_from_disk()
+    if loaded_config is None:
+        _STATE, _DATA = _State.FAILED, {}
         return False
+    _STATE, _DATA = _State.LOADED, loaded_config
+    return True
+
+# Load the configuration once at import
+_load_config()
+
+def reload_config():
+    """
+    Reloads config.json from disk, replacing the configuration loaded at import.
+    Returns True if successful, False otherwise.
+    """
+    return _load_config()
 
 # --- Accessor Functions ---
 
 def get_groq_api_key():
     """Get the Groq API key from the loaded configuration."""
-    if not _load_config():
+    if _STATE is not _State.LOADED:
         raise ValueError(f"Configuration '{CONFIG_FILENAME}' is missing or invalid. Cannot retrieve GROQ_API_KEY.")
-
-    api_key = _config_cache.get("GROQ_API_KEY")
-    if not api_key:  # Should be caught by _load_config, but double-check
-        raise ValueError(f"GROQ_API_KEY is missing or empty in '{CONFIG_FILENAME}'.")
-    return api_key
+    # Presence and non-emptiness are validated when the file is loaded
+    return _DATA["GROQ_API_KEY"]
 
 def get_hotkey():
     """Get the hotkey combination from the loaded configuration."""
-    if not _load_config():
+    if _STATE is not _State.LOADED:
         raise ValueError(f"Configuration '{CONFIG_FILENAME}' is missing or invalid. Cannot retrieve SNIPAI_HOTKEY.")
-
-    hotkey = _config_cache.get("SNIPAI_HOTKEY")
-    if not hotkey:  # Should be caught by _load_config, but double-check
-        raise ValueError(f"SNIPAI_HOTKEY is missing or empty in '{CONFIG_FILENAME}'.")
+    hotkey = _DATA["SNIPAI_HOTKEY"]
     logger.info(f"Using hotkey: {hotkey}")
     return hotkey
 
 # --- Other Config Functions ---
 
+# Smaller model used for short prompts once FAST_MODEL_MAX_CHARS is set
+DEFAULT_FAST_MODEL = "llama-3.1-8b-instant"
+
 def get_llm_model_name():
     """Returns the Groq model name."""
     return "llama-3.3-70b-versatile"
 
-def get_system_prompt():
-    """Returns the default system prompt for the LLM."""
-    return """You are SnipAI, a helpful AI assistant that provides concise, clear, and accurate responses to user inquiries based on the provided text.
+def _get_optional_int(key, default, minimum=0):
+    """Returns an optional integer setting, or default if it is missing or not an integer >= minimum."""
+    # Optional key, so existing config files keep working
+    value = _DATA.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        logger.warning(f"Ignoring invalid {key} in {CONFIG_FILENAME}: {value!r} (expected an integer >= {minimum})")
+        return default
+    return value
+
+def get_llm_fast_model_name():
+    """Returns the smaller Groq model used for short requests."""
+    # Optional key, so existing config files keep working
+    model_name = _DATA.get("SNIPAI_FAST_MODEL", DEFAULT_FAST_MODEL)
+    if not isinstance(model_name, str) or not model_name:
+        logger.warning(f"Ignoring invalid SNIPAI_FAST_MODEL in {CONFIG_FILENAME}: {model_name!r}")
+        return DEFAULT_FAST_MODEL
+    return model_name
+
+def get_fast_model_max_chars():
+    """
+    Returns the prompt size (characters, history included) up to which the fast model is used.
+    Defaults to 0, which sends every request to the main model.
+    """
+    return _get_optional_int("FAST_MODEL_MAX_CHARS", 0)
+
+def get_history_max_turns():
+    """Returns the number of recent conversation turns sent to the LLM as chat history."""
+    return _get_optional_int("HISTORY_MAX_TURNS", 10, minimum=1)
+
+# The system prompt is sent verbatim as a system message (no template formatting)
+SYSTEM_PROMPT = """You are SnipAI, a helpful AI assistant that provides concise, clear, and accurate responses to user inquiries based on the provided text.
 When analyzing text, focus on the most relevant points and provide insightful observations.
 If you're unsure about something, acknowledge it rather than making assumptions.
 
 IMPORTANT: If your response involves providing a modified, translated, summarized, corrected, or otherwise altered version of the original text provided by the user:
 1. You MUST provide this altered text exclusively within a specific JSON format.
-2. Use the following structure exactly: ```json {{"enhanced_content": "Your altered text here"}}```
+2. Use the following structure exactly: ```json {"enhanced_content": "Your altered text here"}```
 3. Any explanation or commentary about the changes should be provided as regular text *outside* the JSON block. Do NOT include explanations inside the JSON.
 
 Example of a proper response when providing altered text (e.g., translation):
 "Here is the Hindi translation:
 
 ```json
-{{"enhanced_content": "यहाँ हिंदी अनुवाद है।"}}
+{"enhanced_content": "यहाँ हिंदी अनुवाद है।"}
 ```
 
 This translates the original English sentence into Hindi."
@@ -130,10 +173,21 @@ This translates the original English sentence into Hindi."
 If you are only answering a question about the text or providing commentary *without* altering the original text itself, do NOT use the JSON format.
 """
 
-def get_initial_user_prompt_template():
-    """Returns the template for the first user message."""
-    return """Selected text:
+# Template for the first user message, filled with % formatting by format_initial_prompt
+INITIAL_USER_TEMPLATE = """Selected text:
 ```
-{selected_text}
+%(selected_text)s
 ```
-Please analyze or respond to the above text."""
\ No newline at end of file
+Please analyze or respond to the above text."""
+
+def get_system_prompt():
+    """Returns the default system prompt for the LLM."""
+    return SYSTEM_PROMPT
+
+def get_initial_user_prompt_template():
+    """Returns the %-style template for the first user message."""
+    return INITIAL_USER_TEMPLATE
+
+def format_initial_prompt(selected_text):
+    """Returns the first user message for the given selected text."""
+    return INITIAL_USER_TEMPLATE % {"selected_text": selected_text}
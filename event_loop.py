@@ -0,0 +1,46 @@
+"""
+Event loop module for the SnipAI application.
+Runs the single background asyncio event loop shared by LLM requests and hotkey handling.
+"""
+import asyncio
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# The LLM service's async HTTP connection pool is bound to this loop, so every
+# coroutine that talks to the Groq API must run here
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """Return the shared background event loop, starting it on a daemon thread on first use."""
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, name="snipai-event-loop", daemon=True).start()
+            logger.info("Background event loop started")
+        return _event_loop
+
+def run(coro, timeout=None):
+    """
+    Run a coroutine on the shared event loop and wait for its result.
+    Must not be called from the event loop thread itself.
+
+    Args:
+        coro (coroutine): The coroutine to run.
+        timeout (float, optional): Seconds to wait for the result.
+
+    Returns:
+        The coroutine's result.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
+
+def stop_event_loop():
+    """Stop the shared event loop if it was started."""
+    with _event_loop_lock:
+        if _event_loop is not None and _event_loop.is_running():
+            _event_loop.call_soon_threadsafe(_event_loop.stop)
+            logger.info("Background event loop stopped")
@@ -5,68 +5,62 @@ Sets up the global hotkey listener with debouncing.
 import time
 import logging
 import keyboard
-import threading
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Flag to track if a hotkey was recently pressed
-_hotkey_pressed = False
+# Monotonic time of the last accepted hotkey press
+_last_fire_ts = 0.0
 _debounce_time = 0.5  # 500ms debounce
 
-def _reset_hotkey_flag():
-    """Resets the hotkey pressed flag."""
-    global _hotkey_pressed
-    _hotkey_pressed = False
-
 def _debounce_callback(callback_function):
     """
     Creates a debounced version of the callback function.
     Prevents multiple rapid firing of the callback if key is held down.
     """
-    global _hotkey_pressed
-    
     def debounced_function():
-        global _hotkey_pressed
-        if not _hotkey_pressed:
-            _hotkey_pressed = True
-            try:
-                callback_function()
-            except Exception as e:
-                logger.error(f"Error in hotkey callback: {str(e)}")
-            
-            # Reset the flag after debounce time using a dedicated function
-            threading.Timer(_debounce_time, _reset_hotkey_flag).start()
+        global _last_fire_ts
+        # Ignore presses within the debounce time of the last accepted one
+        now = time.monotonic()
+        if now - _last_fire_ts < _debounce_time:
+            return
+        _last_fire_ts = now
+        try:
+            callback_function()
+        except Exception as e:
+            logger.error("Error in hotkey callback: %s", e)
     
     return debounced_function
 
-def setup_hotkey(hotkey_combination, callback_function):
+def register_hotkey(hotkey_combination, callback_function):
     """
-    Set up the global hotkey listener.
+    Register the global hotkey without blocking.
+    The keyboard module dispatches presses from its own listener thread.
     
     Args:
         hotkey_combination (str): Keyboard combination to listen for (e.g., 'ctrl+alt+c').
         callback_function (callable): Function to call when hotkey is pressed.
+    
+    Returns:
+        bool: True if the hotkey was registered, False otherwise.
     """
     # Create debounced version of the callback
     debounced_callback = _debounce_callback(callback_function)
     
     try:
         # Register the hotkey
-        logger.info(f"Registering hotkey: {hotkey_combination}")
+        logger.info("Registering hotkey: %s", hotkey_combination)
         keyboard.add_hotkey(hotkey_combination, debounced_callback)
-        logger.info(f"Hotkey {hotkey_combination} registered successfully")
-        
-        # Keep the listener running
-        logger.info("Hotkey listener started")
-        keyboard.wait()
+        logger.info("Hotkey %s registered successfully", hotkey_combination)
+        return True
         
     except Exception as e:
-        logger.error(f"Error setting up hotkey {hotkey_combination}: {str(e)}")
+        logger.error("Error setting up hotkey %s: %s", hotkey_combination, e)
         if "KeyboardEvent" in str(e):
             logger.error("This could be due to permission issues or conflicts with existing hotkeys")
-    
-    finally:
-        # Clean up
-        logger.info("Cleaning up hotkey registrations")
-        keyboard.unhook_all_hotkeys()
\ No newline at end of file
+        return False
+
+def unregister_hotkeys():
+    """Remove all hotkeys registered with the keyboard module."""
+    logger.info("Cleaning up hotkey registrations")
+    keyboard.unhook_all_hotkeys()
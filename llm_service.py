@@ -4,101 +4,170 @@ Handles LangChain setup and interaction with Groq API using the Llama3 model.
 """
 import logging
 import time
-import os
-import ssl
-import urllib3
+import asyncio
+import threading
+import functools
+import importlib.util
 import httpx  # Import httpx
-from operator import itemgetter
+import groq
+from collections import deque
 
-# Disable SSL warnings since we're disabling verification
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, MessagesPlaceholder, HumanMessagePromptTemplate
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain_core.output_parsers import StrOutputParser
-from langchain_groq import ChatGroq
-from langchain.memory import ConversationBufferMemory
+# LangChain is imported where it is first used, since it dominates import time
 
 import config
+import event_loop
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Configure SSL environment variable - disable verification
-os.environ['CURL_CA_BUNDLE'] = ''
-os.environ['SSL_CERT_FILE'] = ''
-os.environ['PYTHONHTTPSVERIFY'] = '0'
-os.environ['REQUESTS_CA_BUNDLE'] = ''
+# HTTP/2 needs the optional h2 package (httpx[http2]); fall back to HTTP/1.1 without it
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Cheap authenticated endpoint used to open a pooled connection before the first chat
+_PREWARM_URL = "https://api.groq.com/openai/v1/models"
+
+# Connection pools shared by every GroqLLMService, so follow-up requests reuse the TLS session.
+# ChatGroq sends async requests (ainvoke/astream) through the async client and sync ones through the other.
+_http_client = None
+_http_async_client = None
+_http_client_lock = threading.Lock()
+
+def _http_client_settings():
+    """Return the keyword arguments shared by the sync and async httpx clients."""
+    return {
+        # Certificate verification is disabled for these two clients only (not process-wide),
+        # and ChatGroq sends all Groq traffic through them
+        "verify": False,
+        "http2": _HTTP2_AVAILABLE,
+        "limits": httpx.Limits(max_keepalive_connections=8, max_connections=16, keepalive_expiry=300.0),
+        "timeout": httpx.Timeout(60.0, connect=10.0)
+    }
 
-# Create a custom SSL context that accepts any certificate
-# This might still be needed for other underlying libraries
-ssl._create_default_https_context = ssl._create_unverified_context
+def _get_http_client():
+    """Return the shared insecure httpx client, creating it on first use (or after close())."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(**_http_client_settings())
+        return _http_client
+
+def _get_http_async_client():
+    """
+    Return the shared insecure async httpx client, creating it on first use (or after close()).
+    Its connections belong to the shared event loop, so it must only be used there.
+    """
+    global _http_async_client
+    with _http_client_lock:
+        if _http_async_client is None or _http_async_client.is_closed:
+            _http_async_client = httpx.AsyncClient(**_http_client_settings())
+        return _http_async_client
+
+class _NoResponseError(Exception):
+    """Raised when the LLM returns an empty response."""
+
+# Exception types that mean the Groq API couldn't be reached in time
+_CONNECTION_ERRORS = (groq.APIConnectionError, httpx.ConnectError, httpx.TimeoutException, httpx.NetworkError)
+
+@functools.lru_cache(maxsize=None)
+def _build_prompt_template(system_prompt_text):
+    """
+    Build the chat prompt template for a system prompt. Templates are immutable,
+    so one instance is shared by every GroqLLMService using the same prompt.
+    
+    Args:
+        system_prompt_text (str): The system prompt, sent as-is.
+        
+    Returns:
+        ChatPromptTemplate: System prompt, chat history placeholder and human input.
+    """
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, HumanMessagePromptTemplate
+    from langchain_core.messages import SystemMessage
+    
+    # A pre-rendered message rather than a template, so it isn't re-formatted on every call
+    system_prompt = SystemMessage(content=system_prompt_text)
+    human_prompt = HumanMessagePromptTemplate.from_template("{human_input}")
+    
+    return ChatPromptTemplate.from_messages([
+        system_prompt,
+        MessagesPlaceholder(variable_name="chat_history"),
+        human_prompt
+    ])
 
 class GroqLLMService:
     """
     Service for interacting with Groq API via LangChain.
     """
     
-    def __init__(self, api_key, model_name):
+    def __init__(self, api_key, model_name, fast_model_name=None, fast_max_chars=0):
         """
         Initialize the Groq LLM service.
         
         Args:
             api_key (str): Groq API key.
             model_name (str): Name of the Groq model to use.
+            fast_model_name (str, optional): Smaller Groq model for short requests.
+            fast_max_chars (int): Prompt size (characters, history included) up to which
+                the fast model is used; 0 sends everything to model_name.
         """
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_groq import ChatGroq
+        
         self.api_key = api_key
         self.model_name = model_name
+        self.fast_max_chars = fast_max_chars
         
         logger.info(f"Initializing GroqLLMService with model: {model_name}")
 
-        # Create an insecure httpx client
-        # This is the primary method to disable SSL for ChatGroq
-        insecure_client = httpx.Client(verify=False)
-
-        # Initialize the LLM, passing the insecure httpx client
-        # Removed the groq_api_base parameter which caused the URL duplication
-        self.llm = ChatGroq(
-            api_key=api_key,
-            model_name=model_name,
-            temperature=0.7,
-            http_client=insecure_client
-        )
+        # Use the shared insecure httpx clients
+        insecure_client = _get_http_client()
+        insecure_async_client = _get_http_async_client()
         
-        # Initialize conversation memory
-        self.memory = ConversationBufferMemory(
-            return_messages=True,
-            memory_key="chat_history"
+        # Open a connection in the background on the shared event loop, where the chat
+        # requests run, so the first hotkey request skips the handshake
+        asyncio.run_coroutine_threadsafe(
+            self._prewarm_connection(insecure_async_client), event_loop.get_event_loop()
         )
-        
-        # Create prompt template
-        # Get system prompt directly as plain text (not as a template with variables)
-        system_prompt_text = config.get_system_prompt()
-        # Create system message directly without specifying format
-        system_prompt = SystemMessagePromptTemplate.from_template(system_prompt_text)
-        human_prompt = HumanMessagePromptTemplate.from_template("{human_input}")
-        
-        self.prompt_template = ChatPromptTemplate.from_messages([
-            system_prompt,
-            MessagesPlaceholder(variable_name="chat_history"),
-            human_prompt
-        ])
-        
-        # Create LangChain chain using LCEL
-        self.chain = (
-            RunnablePassthrough.assign(
-                chat_history=RunnableLambda(self.memory.load_memory_variables) | itemgetter("chat_history")
+
+        def make_llm(name):
+            # Initialize the LLM, passing the insecure httpx clients
+            # Removed the groq_api_base parameter which caused the URL duplication
+            return ChatGroq(
+                api_key=api_key,
+                model_name=name,
+                temperature=0.7,
+                streaming=False,  # Only astream() streams; plain invocations get the whole message at once
+                max_retries=2,
+                http_client=insecure_client,
+                http_async_client=insecure_async_client
             )
-            | self.prompt_template
-            | self.llm
-            | StrOutputParser()
-        )
+        
+        self.llm = make_llm(model_name)
+        # Both models share the pooled httpx clients
+        use_fast_model = fast_model_name and fast_model_name != model_name and fast_max_chars > 0
+        self.llm_fast = make_llm(fast_model_name) if use_fast_model else None
+        
+        # Conversation history: the last N turns as HumanMessage/AIMessage pairs, oldest first.
+        # This is the default conversation; chat windows get their own through new_session()
+        self._history_maxlen = 2 * config.get_history_max_turns()
+        self._history = deque(maxlen=self._history_maxlen)
+        
+        # Get the (cached) prompt template for the system prompt
+        self.prompt_template = _build_prompt_template(config.get_system_prompt())
+        
+        # Create LangChain chain using LCEL; callers pass the chat history in with the input
+        # (see _chain_input) instead of running an extra history lookup step in the chain
+        self.chain = self.prompt_template | self.llm | StrOutputParser()
+        self._fast_chain = (self.prompt_template | self.llm_fast | StrOutputParser()) if self.llm_fast else None
+        if self.llm_fast:
+            logger.info(f"Using {fast_model_name} for prompts up to {fast_max_chars} chars")
         
         logger.info("GroqLLMService initialized successfully")
     
     def invoke_chain(self, user_input):
         """
         Invoke the LangChain chain with user input.
+        Blocking wrapper that runs ainvoke_chain on the shared event loop;
+        must not be called from that loop.
         
         Args:
             user_input (str): User message text.
@@ -106,39 +175,193 @@ class GroqLLMService:
         Returns:
             str: AI response text.
         """
+        return event_loop.run(self.ainvoke_chain(user_input))
+    
+    async def ainvoke_chain(self, user_input, on_token=None, history=None):
+        """
+        Invoke the LangChain chain with user input, streaming tokens as they are generated.
+        
+        Args:
+            user_input (str): User message text.
+            on_token (callable, optional): Called on the event loop with each text chunk.
+            history (deque, optional): Conversation to use and extend; defaults to the service's own.
+            
+        Returns:
+            str: Full AI response text, or a categorized error message.
+        """
+        if history is None:
+            history = self._history
         try:
             logger.info(f"Invoking LLM with user input ({len(user_input)} chars)")
             
-            # Simply invoke the chain directly
-            ai_response = self.chain.invoke({"human_input": user_input})
+            chain_input = self._chain_input(user_input, history)
+            if on_token is None:
+                # Nobody consumes tokens, so skip creating message chunks
+                ai_response = await self._pick_chain(chain_input).ainvoke(chain_input)
+            else:
+                chunks = []
+                async for chunk in self._pick_chain(chain_input).astream(chain_input):
+                    chunks.append(chunk)
+                    on_token(chunk)
+                ai_response = "".join(chunks)
             
             # Check if response is empty or None
             if not ai_response or ai_response.strip() == "":
-                raise Exception("No response received from LLM service")
+                raise _NoResponseError("No response received from LLM service")
             
-            # Save context to memory
-            self.memory.save_context(
-                {"human_input": user_input},
-                {"output": ai_response}
-            )
+            # Save the exchange to the history
+            self.add_exchange(user_input, ai_response, history)
             
             logger.info(f"LLM response received ({len(ai_response)} chars)")
             return ai_response
             
         except Exception as e:
-            error_msg = f"Error invoking LLM: {str(e)}"
-            logger.error(error_msg)
+            return self._format_error(e)
+    
+    async def ainvoke_batch(self, inputs, history=None):
+        """
+        Invoke the LLM with several independent prompts concurrently.
+        Every prompt sees the current chat history, but the exchanges are not saved to
+        it, since concurrent writes would interleave the conversation.
+        
+        Args:
+            inputs (list): User message texts.
+            history (deque, optional): Conversation to read; defaults to the service's own.
             
-            # Check for common API key related errors
-            error_str = str(e).lower()
-            if "api key" in error_str or "authentication" in error_str or "unauthorized" in error_str or "auth" in error_str:
-                return "API_KEY_ERROR: Your API key appears to be invalid or has expired. Please check your API key in the settings."
-            elif "timeout" in error_str or "connection" in error_str or "network" in error_str:
-                return "CONNECTION_ERROR: Unable to connect to the LLM service. Please check your internet connection."
-            elif "no response" in error_str:
-                return "NO_RESPONSE_ERROR: No response received from the LLM service. The service might be experiencing high load."
+        Returns:
+            list: AI response text or categorized error message for each input, in order.
+        """
+        if history is None:
+            history = self._history
+        logger.info(f"Invoking LLM with a batch of {len(inputs)} inputs")
+        results = await asyncio.gather(
+            *(self._pick_chain(chain_input).ainvoke(chain_input)
+              for chain_input in (self._chain_input(user_input, history) for user_input in inputs)),
+            return_exceptions=True
+        )
+        
+        responses = []
+        for result in results:
+            if isinstance(result, Exception):
+                responses.append(self._format_error(result))
+            elif not result or result.strip() == "":
+                responses.append(self._format_error(_NoResponseError("No response received from LLM service")))
             else:
-                return f"ERROR: {str(e)}\n\nPlease try again in a moment."
+                responses.append(result)
+        return responses
+    
+    def _chain_input(self, user_input, history):
+        """
+        Build the chain input for a user message with a snapshot of a conversation history.
+        
+        Args:
+            user_input (str): User message text.
+            history (deque): The conversation history.
+            
+        Returns:
+            dict: The human_input and chat_history prompt variables.
+        """
+        # The first turn (the common case) has no history to copy
+        return {"human_input": user_input, "chat_history": list(history) if history else []}
+    
+    def _pick_chain(self, chain_input):
+        """
+        Choose the chain for a request: the fast model for short prompts, otherwise the main model.
+        
+        Args:
+            chain_input (dict): The chain input from _chain_input.
+            
+        Returns:
+            Runnable: The chain to invoke.
+        """
+        if self._fast_chain is None:
+            return self.chain
+        
+        prompt_chars = len(chain_input["human_input"])
+        prompt_chars += sum(len(message.content) for message in chain_input["chat_history"])
+        return self._fast_chain if prompt_chars <= self.fast_max_chars else self.chain
+    
+    def add_exchange(self, user_input, ai_response, history=None):
+        """
+        Append a user message and its AI response to a conversation history.
+        
+        Args:
+            user_input (str): User message text.
+            ai_response (str): AI response text.
+            history (deque, optional): Conversation to extend; defaults to the service's own.
+        """
+        from langchain_core.messages import HumanMessage, AIMessage
+        
+        if history is None:
+            history = self._history
+        history.append(HumanMessage(content=user_input))
+        history.append(AIMessage(content=ai_response))
+    
+    def clear_history(self):
+        """Forget the service's own conversation history."""
+        self._history.clear()
+    
+    def new_session(self):
+        """
+        Start a conversation with its own history, so several chat windows don't share one.
+        
+        Returns:
+            ChatSession: The new conversation.
+        """
+        return ChatSession(self, deque(maxlen=self._history_maxlen))
+    
+    def _format_error(self, e):
+        """
+        Log an LLM invocation error and convert it to a categorized error message.
+        
+        Args:
+            e (Exception): The exception raised while invoking the chain.
+            
+        Returns:
+            str: Error message prefixed with its category.
+        """
+        error_msg = f"Error invoking LLM: {str(e)}"
+        logger.error(error_msg)
+        
+        # Categorize by exception type rather than scanning the message
+        if isinstance(e, groq.AuthenticationError):
+            return "API_KEY_ERROR: Your API key appears to be invalid or has expired. Please check your API key in the settings."
+        elif isinstance(e, _CONNECTION_ERRORS):
+            return "CONNECTION_ERROR: Unable to connect to the LLM service. Please check your internet connection."
+        elif isinstance(e, _NoResponseError):
+            return "NO_RESPONSE_ERROR: No response received from the LLM service. The service might be experiencing high load."
+        else:
+            return f"ERROR: {str(e)}\n\nPlease try again in a moment."
+    
+    async def _prewarm_connection(self, client):
+        """
+        Send a cheap request to the Groq API so a connection is left in the keep-alive pool.
+        
+        Args:
+            client (httpx.AsyncClient): The shared async client used by ChatGroq.
+        """
+        try:
+            await client.get(_PREWARM_URL, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=5)
+            logger.info("Groq API connection pre-warmed")
+        except Exception as e:
+            # The real request will simply open its own connection
+            logger.warning(f"Could not pre-warm Groq API connection: {e}")
+    
+    def close(self):
+        """
+        Close the shared HTTP clients and their pooled connections.
+        Must be called before the shared event loop is stopped, and not from that loop.
+        """
+        global _http_client, _http_async_client
+        with _http_client_lock:
+            client, async_client = _http_client, _http_async_client
+            _http_client = _http_async_client = None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            # The async pool's connections belong to the shared loop, so they are closed there
+            event_loop.run(async_client.aclose(), timeout=5)
+        logger.info("GroqLLMService HTTP clients closed")
     
     def prepare_initial_conversation(self, selected_text):
         """
@@ -150,16 +373,44 @@ class GroqLLMService:
         Returns:
             str: Initial AI response.
         """
-        # Clear any existing memory
-        self.memory.clear()
+        # Clear any existing history
+        self.clear_history()
         
         # Format the initial user message
-        initial_prompt_template = config.get_initial_user_prompt_template()
-        initial_prompt = initial_prompt_template.format(selected_text=selected_text)
+        initial_prompt = config.format_initial_prompt(selected_text)
         
         logger.info("Preparing initial conversation with selected text")
         return self.invoke_chain(initial_prompt)
 
+class ChatSession:
+    """
+    One conversation (e.g. a chat window) with its own history. The models, chains
+    and pooled HTTP client of the service are shared by all sessions.
+    """
+    
+    def __init__(self, service, history):
+        """
+        Initialize the chat session.
+        
+        Args:
+            service (GroqLLMService): The service used to invoke the LLM.
+            history (deque): The (empty) history of this conversation.
+        """
+        self.service = service
+        self.history = history
+    
+    async def ainvoke_chain(self, user_input, on_token=None):
+        """Invoke the LLM within this conversation; see GroqLLMService.ainvoke_chain."""
+        return await self.service.ainvoke_chain(user_input, on_token, self.history)
+    
+    def add_exchange(self, user_input, ai_response):
+        """Append a user message and its AI response to this conversation."""
+        self.service.add_exchange(user_input, ai_response, self.history)
+    
+    def clear_history(self):
+        """Forget this conversation's history."""
+        self.history.clear()
+
 # Test function for when this module is run directly
 def test_llm_service():
     """
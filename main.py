@@ -4,19 +4,21 @@ Initializes the application and starts the hotkey listener.
 """
 import os
 import logging
-import threading
-import customtkinter as ctk
-import pyautogui
-import pygetwindow as gw  # Import pygetwindow for window management
+import logging.handlers
+import queue
+import atexit
+import asyncio
 import sys  # Add sys import
 from datetime import datetime  # Import datetime
 import tkinter.messagebox as messagebox  # Import messagebox
 
-from llm_service import GroqLLMService
+# customtkinter, pyautogui (non-Windows fallback), pygetwindow, llm_service (LangChain) and chat_window are
+# imported where they are first used, to keep cold start fast
 import hotkey_manager
 import clipboard_handler
 import config
-from chat_window import ChatWindow
+import event_loop
+import win_api
 
 # Determine application path
 if getattr(sys, 'frozen', False):
@@ -45,15 +47,22 @@ def setup_logging():
         if root_logger.hasHandlers():
             root_logger.handlers.clear()
 
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(),  # Keep console output
-                logging.FileHandler(log_file_path)  # Add file handler
-            ]
-        )
+        # Configure logging: callers only enqueue records, and a listener thread
+        # writes them to the console and the log file
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        stream_handler = logging.StreamHandler()  # Keep console output
+        stream_handler.setFormatter(formatter)
+        file_handler = logging.FileHandler(log_file_path)  # Add file handler
+        file_handler.setFormatter(formatter)
+        
+        log_queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler)
+        listener.start()
+        atexit.register(listener.stop)  # Flush queued records on exit
+        
+        # The queue handler keeps the default formatter so records aren't formatted twice
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        root_logger.setLevel(logging.INFO)
         logging.info(f"Logging initialized. Log file: {log_file_path}")
 
     except Exception as e:
@@ -69,22 +78,61 @@ def setup_logging():
 setup_logging()
 logger = logging.getLogger(__name__)  # Get logger instance after setup
 
+# config.json was first loaded when config was imported, before the log file existed;
+# load it again so that any load errors also reach the log file
+config.reload_config()
+
+# How often the Tk thread checks whether the services have started
+_SERVICES_POLL_MS = 50
+
 # Global variables
 llm_service = None
 root = None
+capture_lock = None  # Serializes text captures; created on the shared event loop
+no_text_dialog = None  # No-text dialog, built on first use and hidden (not destroyed) when closed
+
+def _log_future_error(future):
+    """Logs the exception of a finished event loop task, if it raised one."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Background task failed", exc_info=future.exception())
 
 def trigger_chat_popup():
     """
     Callback function for hotkey press.
-    Captures selected text and opens a chat window.
+    Hands the press to the shared event loop so the hotkey listener returns immediately.
     """
-    global llm_service, root
+    future = asyncio.run_coroutine_threadsafe(_handle_hotkey(), event_loop.get_event_loop())
+    future.add_done_callback(_log_future_error)
+
+async def _handle_hotkey():
+    """Handles a hotkey press on the shared event loop."""
+    global capture_lock
+    if capture_lock is None:
+        capture_lock = asyncio.Lock()
     
+    # The blocking capture runs in a worker thread so it doesn't stall LLM requests on the loop,
+    # and presses arriving meanwhile wait for it instead of sending overlapping Ctrl+C presses
+    async with capture_lock:
+        await asyncio.to_thread(_capture_and_open_chat)
+
+def _capture_and_open_chat():
+    """
+    Captures the selected text and cursor position (worker thread),
+    then opens a chat window or the no-text dialog on the Tk thread.
+    """
     try:
         # Get the active window before any operations
         try:
-            active_window = gw.getActiveWindow()
-            window_title = active_window.title if active_window else "Unknown"
+            import pygetwindow as gw  # Import pygetwindow for window management
+            
+            if win_api.IS_WINDOWS:
+                # Wrap the foreground handle directly; the title comes from the same handle
+                hwnd = win_api.get_foreground_window()
+                active_window = gw.Win32Window(hwnd) if hwnd else None
+                window_title = win_api.get_window_title(hwnd) if hwnd else "Unknown"
+            else:
+                active_window = gw.getActiveWindow()
+                window_title = active_window.title if active_window else "Unknown"
             logger.info(f"Active window when hotkey triggered: {window_title}")
         except Exception as e:
             logger.error(f"Error getting active window: {str(e)}")
@@ -97,73 +145,230 @@ def trigger_chat_popup():
             logger.info(f"Selected text captured: {len(selected_text)} characters")
             
             # Get the current cursor position
-            mouse_x, mouse_y = pyautogui.position()
+            mouse_position = win_api.get_cursor_pos()
+            if mouse_position is None:
+                import pyautogui
+                mouse_position = pyautogui.position()
+            mouse_x, mouse_y = mouse_position
             logger.info(f"Mouse position: x={mouse_x}, y={mouse_y}")
             
             # Create a chat window with the selected text, cursor position, and source window
-            ChatWindow(selected_text, llm_service, mouse_x, mouse_y, active_window)
+            root.after(0, _open_chat_window, selected_text, mouse_x, mouse_y, active_window)
         else:
             logger.warning("No text selected or text capture failed")
             
             # Show an error dialog to the user
-            error_window = ctk.CTkToplevel(root)
-            error_window.title("SnipAI - No Text Selected")
-            error_window.geometry("350x180")
-            error_window.attributes("-topmost", True)
-            
-            # Center the window
-            screen_width = error_window.winfo_screenwidth()
-            screen_height = error_window.winfo_screenheight()
-            x = (screen_width - 350) // 2
-            y = (screen_height - 180) // 2
-            error_window.geometry(f"+{x}+{y}")
-            
-            # Configure color scheme
-            bg_color = "#2E2E2E"
-            text_color = "#FFFFFF"
-            button_color = "#4A6BDF"
-            button_hover = "#3A5BCF"
-            
-            # Set appearance
-            error_window.configure(fg_color=bg_color)
-            
-            # Add error message frame
-            error_frame = ctk.CTkFrame(error_window, fg_color=bg_color)
-            error_frame.pack(fill="both", expand=True, padx=20, pady=20)
-            
-            # Add icon or warning symbol
-            warning_label = ctk.CTkLabel(
-                error_frame,
-                text="⚠️",
-                font=("Helvetica", 24),
-                text_color="#FFCC00"
-            )
-            warning_label.pack(pady=(5, 0))
-            
-            # Add error message
-            message_label = ctk.CTkLabel(
-                error_frame, 
-                text="No text was selected.\n\nPlease select some text before pressing the Alt+Shift+S hotkey.",
-                font=("Helvetica", 12),
-                wraplength=280,
-                text_color=text_color
-            )
-            message_label.pack(pady=10)
-            
-            # Add close button
-            close_button = ctk.CTkButton(
-                error_frame, 
-                text="OK", 
-                command=error_window.destroy,
-                fg_color=button_color,
-                hover_color=button_hover,
-                width=100
-            )
-            close_button.pack(pady=10)
+            root.after(0, _show_no_text_dialog)
             
     except Exception as e:
         logger.error(f"Error in trigger_chat_popup: {str(e)}")
 
+def _open_chat_window(selected_text, mouse_x, mouse_y, active_window):
+    """Opens a chat window for the captured text (Tk thread)."""
+    from chat_window import ChatWindow
+    
+    try:
+        ChatWindow(selected_text, llm_service, mouse_x, mouse_y, active_window)
+    except Exception as e:
+        logger.error(f"Error opening chat window: {str(e)}")
+
+def _show_no_text_dialog():
+    """Shows the dialog telling the user that no text was selected (Tk thread)."""
+    global no_text_dialog
+    
+    try:
+        if no_text_dialog is None or not no_text_dialog.winfo_exists():
+            no_text_dialog = _build_no_text_dialog()
+        else:
+            no_text_dialog.deiconify()
+        no_text_dialog.lift()
+    except Exception as e:
+        logger.error(f"Error showing no-text dialog: {str(e)}")
+
+def _build_no_text_dialog():
+    """Builds the no-text dialog; closing it only hides it so it can be shown again."""
+    import customtkinter as ctk
+    
+    error_window = ctk.CTkToplevel(root)
+    error_window.title("SnipAI - No Text Selected")
+    error_window.geometry("350x180")
+    error_window.attributes("-topmost", True)
+    
+    # Center the window
+    screen_width = error_window.winfo_screenwidth()
+    screen_height = error_window.winfo_screenheight()
+    x = (screen_width - 350) // 2
+    y = (screen_height - 180) // 2
+    error_window.geometry(f"+{x}+{y}")
+    
+    # Configure color scheme
+    bg_color = "#2E2E2E"
+    text_color = "#FFFFFF"
+    button_color = "#4A6BDF"
+    button_hover = "#3A5BCF"
+    
+    # Set appearance
+    error_window.configure(fg_color=bg_color)
+    
+    # Add error message frame
+    error_frame = ctk.CTkFrame(error_window, fg_color=bg_color)
+    error_frame.pack(fill="both", expand=True, padx=20, pady=20)
+    
+    # Add icon or warning symbol
+    warning_label = ctk.CTkLabel(
+        error_frame,
+        text="⚠️",
+        font=("Helvetica", 24),
+        text_color="#FFCC00"
+    )
+    warning_label.pack(pady=(5, 0))
+    
+    # Add error message
+    message_label = ctk.CTkLabel(
+        error_frame, 
+        text="No text was selected.\n\nPlease select some text before pressing the Alt+Shift+S hotkey.",
+        font=("Helvetica", 12),
+        wraplength=280,
+        text_color=text_color
+    )
+    message_label.pack(pady=10)
+    
+    # Add close button
+    close_button = ctk.CTkButton(
+        error_frame, 
+        text="OK", 
+        command=error_window.withdraw,
+        fg_color=button_color,
+        hover_color=button_hover,
+        width=100
+    )
+    close_button.pack(pady=10)
+    error_window.protocol("WM_DELETE_WINDOW", error_window.withdraw)
+    return error_window
+
+def _create_llm_service(api_key, model_name):
+    """Imports LangChain and creates the LLM service (worker thread)."""
+    from llm_service import GroqLLMService
+    return GroqLLMService(
+        api_key,
+        model_name,
+        fast_model_name=config.get_llm_fast_model_name(),
+        fast_max_chars=config.get_fast_model_max_chars()
+    )
+
+async def _start_services(api_key, model_name, hotkey):
+    """
+    Creates the LLM service, then registers the hotkey (shared event loop).
+    Raises if either step fails.
+    """
+    global llm_service
+    # The LangChain imports and client setup block, so they run in a worker thread
+    logger.info("Initializing LLM service...")
+    llm_service = await asyncio.to_thread(_create_llm_service, api_key, model_name)
+    logger.info("LLM service initialized.")
+    
+    if not hotkey_manager.register_hotkey(hotkey, trigger_chat_popup):
+        raise RuntimeError(f"Could not register the hotkey '{hotkey}'.")
+    logger.info(f"Hotkey '{hotkey}' registered. SnipAI is running.")
+
+def _wait_for_services(future, hotkey):
+    """
+    Shows the ready popup once the services have started, or exits SnipAI if they failed (Tk thread).
+    Polls the startup future, since Tk calls can't be made from the event loop thread.
+    """
+    if not future.done():
+        root.after(_SERVICES_POLL_MS, _wait_for_services, future, hotkey)
+        return
+    
+    error = future.exception()
+    if error is not None:
+        logger.critical(f"Failed to start SnipAI services: {error}", exc_info=error)
+        messagebox.showerror(
+            "SnipAI Error",
+            f"Failed to start SnipAI:\n{error}\n\nPlease check the logs for details.\nSnipAI will now exit."
+        )
+        root.quit()  # Leaves the main loop, so main() cleans up and exits
+        return
+    
+    print(f"SnipAI is running. Press {hotkey} after selecting text.")
+    print("Check the 'logs' folder for detailed logs.")
+    _show_success_popup(hotkey)
+
+def _show_success_popup(hotkey):
+    """Shows the popup telling the user that SnipAI is ready (Tk thread)."""
+    import customtkinter as ctk
+    
+    try:
+        # Create a window for the success popup
+        success_window = ctk.CTkToplevel(root)
+        success_window.title("SnipAI - Ready")
+        success_window.geometry("400x220")
+        success_window.attributes("-topmost", True)
+        
+        # Center the window on screen
+        screen_width = success_window.winfo_screenwidth()
+        screen_height = success_window.winfo_screenheight()
+        x = (screen_width - 400) // 2
+        y = (screen_height - 220) // 2
+        success_window.geometry(f"+{x}+{y}")
+        
+        # Configure color scheme
+        bg_color = "#2E2E2E"
+        text_color = "#FFFFFF"
+        success_color = "#4CAF50"  # Green for success
+        button_color = "#4A6BDF"
+        button_hover = "#3A5BCF"
+        
+        # Set appearance
+        success_window.configure(fg_color=bg_color)
+        
+        # Add success message frame
+        success_frame = ctk.CTkFrame(success_window, fg_color=bg_color)
+        success_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        # Add success icon/symbol
+        success_label = ctk.CTkLabel(
+            success_frame,
+            text="✓",  # Success symbol
+            font=("Helvetica", 32),
+            text_color=success_color
+        )
+        success_label.pack(pady=(5, 10))
+        
+        # Add success title
+        title_label = ctk.CTkLabel(
+            success_frame,
+            text="SnipAI Ready",
+            font=("Helvetica", 16, "bold"),
+            text_color=success_color
+        )
+        title_label.pack(pady=(0, 10))
+        
+        # Add success message
+        success_message = f"SnipAI has started successfully!\n\nPress '{hotkey}' after selecting text to activate."
+        message_label = ctk.CTkLabel(
+            success_frame, 
+            text=success_message,
+            font=("Helvetica", 12),
+            wraplength=360,
+            text_color=text_color
+        )
+        message_label.pack(pady=10)
+        
+        # Add OK button
+        ok_button = ctk.CTkButton(
+            success_frame, 
+            text="OK",
+            command=success_window.destroy,
+            fg_color=button_color,
+            hover_color=button_hover,
+            width=100
+        )
+        ok_button.pack(pady=10)
+    except Exception as popup_err:
+        logger.error(f"Failed to show success popup: {popup_err}")
+        # Continue running even if success popup fails
+
 def main():
     """Main entry point for the SnipAI application."""
     global llm_service, root
@@ -173,6 +378,7 @@ def main():
 
         # Initialize GUI root early for potential error popups
         try:
+            import customtkinter as ctk
             ctk.set_appearance_mode("System")  # Or "dark"/"light"
             ctk.set_default_color_theme("blue")
             root = ctk.CTk()
@@ -275,95 +481,14 @@ def main():
             
             return  # Exit the application after showing the error
         
-        # Initialize Services (only if config loaded)
-        logger.info("Initializing LLM service...")
-        llm_service = GroqLLMService(groq_api_key, model_name)
-        logger.info("LLM service initialized.")
-        
-        # Register Hotkey (only if config loaded)
-        logger.info(f"Registering hotkey '{hotkey}'...")
-        hotkey_thread = threading.Thread(
-            target=lambda: hotkey_manager.setup_hotkey(hotkey, trigger_chat_popup),
-            daemon=True
+        # Initialize Services and register the hotkey (only if config loaded)
+        # on the shared event loop, without blocking the GUI; the ready popup follows once they're up
+        services_future = asyncio.run_coroutine_threadsafe(
+            _start_services(groq_api_key, model_name, hotkey), event_loop.get_event_loop()
         )
-        hotkey_thread.start()
-        logger.info(f"Hotkey '{hotkey}' registered. SnipAI is running.")
-        print(f"SnipAI is running. Press {hotkey} after selecting text.")
-        print("Check the 'logs' folder for detailed logs.")
+        root.after(_SERVICES_POLL_MS, _wait_for_services, services_future, hotkey)
         
-        # --- Show Success Popup --- 
-        try:
-            # Create a window for the success popup
-            success_window = ctk.CTkToplevel(root)
-            success_window.title("SnipAI - Ready")
-            success_window.geometry("400x220")
-            success_window.attributes("-topmost", True)
-            
-            # Center the window on screen
-            screen_width = success_window.winfo_screenwidth()
-            screen_height = success_window.winfo_screenheight()
-            x = (screen_width - 400) // 2
-            y = (screen_height - 220) // 2
-            success_window.geometry(f"+{x}+{y}")
-            
-            # Configure color scheme
-            bg_color = "#2E2E2E"
-            text_color = "#FFFFFF"
-            success_color = "#4CAF50"  # Green for success
-            button_color = "#4A6BDF"
-            button_hover = "#3A5BCF"
-            
-            # Set appearance
-            success_window.configure(fg_color=bg_color)
-            
-            # Add success message frame
-            success_frame = ctk.CTkFrame(success_window, fg_color=bg_color)
-            success_frame.pack(fill="both", expand=True, padx=20, pady=20)
-            
-            # Add success icon/symbol
-            success_label = ctk.CTkLabel(
-                success_frame,
-                text="✓",  # Success symbol
-                font=("Helvetica", 32),
-                text_color=success_color
-            )
-            success_label.pack(pady=(5, 10))
-            
-            # Add success title
-            title_label = ctk.CTkLabel(
-                success_frame,
-                text="SnipAI Ready",
-                font=("Helvetica", 16, "bold"),
-                text_color=success_color
-            )
-            title_label.pack(pady=(0, 10))
-            
-            # Add success message
-            success_message = f"SnipAI has started successfully!\n\nPress '{hotkey}' after selecting text to activate."
-            message_label = ctk.CTkLabel(
-                success_frame, 
-                text=success_message,
-                font=("Helvetica", 12),
-                wraplength=360,
-                text_color=text_color
-            )
-            message_label.pack(pady=10)
-            
-            # Add OK button
-            ok_button = ctk.CTkButton(
-                success_frame, 
-                text="OK",
-                command=success_window.destroy,
-                fg_color=button_color,
-                hover_color=button_hover,
-                width=100
-            )
-            ok_button.pack(pady=10)
-        except Exception as popup_err:
-            logger.error(f"Failed to show success popup: {popup_err}")
-            # Continue running even if success popup fails
-        
-        # Hide the root window after showing the success popup
+        # Hide the root window; the popups are separate windows
         root.withdraw()
         
         # Start the main GUI loop (only if everything initialized)
@@ -384,7 +509,14 @@ def main():
             print(f"CRITICAL ERROR: {e}. Check logs.")  # Fallback print
     
     finally:
-        # Clean up
+        # Clean up; the LLM service closes its connections on the event loop, so it goes first
+        if llm_service:
+            hotkey_manager.unregister_hotkeys()
+            try:
+                llm_service.close()
+            except Exception as close_err:
+                logger.error(f"Error closing LLM service: {close_err}")
+        event_loop.stop_event_loop()
         if root and root.winfo_exists():  # Check if root exists before destroying
             try:
                 root.destroy()
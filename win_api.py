@@ -0,0 +1,260 @@
+"""
+Windows API module for the SnipAI application.
+Provides direct user32 calls for input simulation, clipboard access and window/cursor queries on Windows.
+"""
+import sys
+import time
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = sys.platform == "win32"
+
+# Virtual key codes
+VK_SHIFT = 0x10
+VK_LEFT = 0x25
+
+_INPUT_KEYBOARD = 1
+_KEYEVENTF_EXTENDEDKEY = 0x0001
+_KEYEVENTF_KEYUP = 0x0002
+
+# Navigation keys that must be sent with the extended-key flag
+_EXTENDED_KEYS = frozenset({VK_LEFT})
+
+CF_UNICODETEXT = 13
+_GMEM_MOVEABLE = 0x0002
+
+# Another process may hold the clipboard briefly, so opening it is retried
+_OPEN_CLIPBOARD_ATTEMPTS = 10
+_OPEN_CLIPBOARD_RETRY_DELAY = 0.01
+
+if IS_WINDOWS:
+    import ctypes
+    from ctypes import wintypes
+
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [
+            ("wVk", wintypes.WORD),
+            ("wScan", wintypes.WORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t)  # ULONG_PTR
+        ]
+
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [
+            ("dx", wintypes.LONG),
+            ("dy", wintypes.LONG),
+            ("mouseData", wintypes.DWORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t)  # ULONG_PTR
+        ]
+
+    class _INPUTUNION(ctypes.Union):
+        # MOUSEINPUT is included so the union has the size SendInput expects
+        _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT)]
+
+    class _INPUT(ctypes.Structure):
+        _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int)
+    _user32.SendInput.restype = wintypes.UINT
+    _user32.GetCursorPos.argtypes = (ctypes.POINTER(wintypes.POINT),)
+    _user32.GetCursorPos.restype = wintypes.BOOL
+    _user32.GetForegroundWindow.argtypes = ()
+    _user32.GetForegroundWindow.restype = wintypes.HWND
+    _user32.GetWindowTextLengthW.argtypes = (wintypes.HWND,)
+    _user32.GetWindowTextLengthW.restype = ctypes.c_int
+    _user32.GetWindowTextW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+    _user32.GetWindowTextW.restype = ctypes.c_int
+    _user32.OpenClipboard.argtypes = (wintypes.HWND,)
+    _user32.OpenClipboard.restype = wintypes.BOOL
+    _user32.CloseClipboard.argtypes = ()
+    _user32.CloseClipboard.restype = wintypes.BOOL
+    _user32.EmptyClipboard.argtypes = ()
+    _user32.EmptyClipboard.restype = wintypes.BOOL
+    _user32.GetClipboardData.argtypes = (wintypes.UINT,)
+    _user32.GetClipboardData.restype = wintypes.HANDLE
+    _user32.SetClipboardData.argtypes = (wintypes.UINT, wintypes.HANDLE)
+    _user32.SetClipboardData.restype = wintypes.HANDLE
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.GlobalAlloc.argtypes = (wintypes.UINT, ctypes.c_size_t)
+    _kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+    _kernel32.GlobalLock.argtypes = (wintypes.HGLOBAL,)
+    _kernel32.GlobalLock.restype = wintypes.LPVOID
+    _kernel32.GlobalUnlock.argtypes = (wintypes.HGLOBAL,)
+    _kernel32.GlobalUnlock.restype = wintypes.BOOL
+    _kernel32.GlobalFree.argtypes = (wintypes.HGLOBAL,)
+    _kernel32.GlobalFree.restype = wintypes.HGLOBAL
+
+def _build_key_events(keys):
+    """Build a SendInput array of keyboard events from (virtual_key_code, key_up) tuples."""
+    events = (_INPUT * len(keys))()
+    for event, (vk, key_up) in zip(events, keys):
+        flags = _KEYEVENTF_KEYUP if key_up else 0
+        if vk in _EXTENDED_KEYS:
+            flags |= _KEYEVENTF_EXTENDEDKEY
+        event.type = _INPUT_KEYBOARD
+        event.u.ki = _KEYBDINPUT(wVk=vk, wScan=0, dwFlags=flags, time=0, dwExtraInfo=0)
+    return events
+
+def send_key_batch(keys):
+    """
+    Send a sequence of key events to the foreground window with a single SendInput call.
+
+    Args:
+        keys (list): (virtual_key_code, key_up) tuples in the order they should be sent.
+
+    Returns:
+        bool: True if every event was injected, False if none were (always on non-Windows platforms),
+            so the caller can safely send the sequence another way.
+
+    Raises:
+        OSError: If only some of the events were injected. Keys left held down are released
+            first; the sequence must not be replayed, since part of it already went through.
+    """
+    if not IS_WINDOWS or not keys:
+        return False
+
+    events = _build_key_events(keys)
+    sent = _user32.SendInput(len(keys), events, ctypes.sizeof(_INPUT))
+    if sent == len(keys):
+        return True
+
+    error = ctypes.get_last_error()
+    logger.warning(f"SendInput injected {sent} of {len(keys)} key events (error {error})")
+    if sent == 0:
+        return False
+
+    # Release the keys whose key-down went through without their key-up (e.g. Shift)
+    held = []
+    for vk, key_up in keys[:sent]:
+        if key_up:
+            if vk in held:
+                held.remove(vk)
+        elif vk not in held:
+            held.append(vk)
+    if held:
+        releases = [(vk, True) for vk in reversed(held)]
+        _user32.SendInput(len(releases), _build_key_events(releases), ctypes.sizeof(_INPUT))
+    raise OSError(f"SendInput injected only {sent} of {len(keys)} key events")
+
+def get_cursor_pos():
+    """
+    Get the current mouse cursor position in screen coordinates.
+
+    Returns:
+        tuple or None: (x, y), or None if it couldn't be read (always on non-Windows platforms).
+    """
+    if not IS_WINDOWS:
+        return None
+
+    point = wintypes.POINT()
+    if not _user32.GetCursorPos(ctypes.byref(point)):
+        logger.warning(f"GetCursorPos failed (error {ctypes.get_last_error()})")
+        return None
+    return point.x, point.y
+
+def get_foreground_window():
+    """
+    Get the handle of the window the user is currently working in.
+
+    Returns:
+        int or None: The window handle, or None if there is none (always on non-Windows platforms).
+    """
+    if not IS_WINDOWS:
+        return None
+    return _user32.GetForegroundWindow() or None
+
+def get_window_title(hwnd):
+    """
+    Get the title bar text of a window.
+
+    Args:
+        hwnd (int): The window handle.
+
+    Returns:
+        str: The window title (empty if the window has none).
+    """
+    length = _user32.GetWindowTextLengthW(hwnd)
+    buffer = ctypes.create_unicode_buffer(length + 1)
+    _user32.GetWindowTextW(hwnd, buffer, length + 1)
+    return buffer.value
+
+def _open_clipboard():
+    """Open the clipboard for the current task, retrying while another process holds it."""
+    for _ in range(_OPEN_CLIPBOARD_ATTEMPTS):
+        if _user32.OpenClipboard(None):
+            return
+        time.sleep(_OPEN_CLIPBOARD_RETRY_DELAY)
+    raise ctypes.WinError(ctypes.get_last_error())
+
+def get_clipboard_text():
+    """
+    Read the Unicode text currently on the Windows clipboard.
+
+    Returns:
+        str: The clipboard text, or an empty string if the clipboard holds no text.
+
+    Raises:
+        OSError: If the clipboard could not be opened or read (always raised on non-Windows platforms).
+    """
+    if not IS_WINDOWS:
+        raise OSError("The Windows clipboard is only available on Windows")
+
+    _open_clipboard()
+    try:
+        handle = _user32.GetClipboardData(CF_UNICODETEXT)
+        if not handle:
+            return ""
+        pointer = _kernel32.GlobalLock(handle)
+        if not pointer:
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            return ctypes.wstring_at(pointer)
+        finally:
+            _kernel32.GlobalUnlock(handle)
+    finally:
+        _user32.CloseClipboard()
+
+def set_clipboard_text(text):
+    """
+    Replace the Windows clipboard content with the given text.
+
+    Args:
+        text (str): The text to place on the clipboard; an empty string just clears it.
+
+    Raises:
+        OSError: If the clipboard could not be opened or written (always raised on non-Windows platforms).
+    """
+    if not IS_WINDOWS:
+        raise OSError("The Windows clipboard is only available on Windows")
+
+    _open_clipboard()
+    try:
+        if not _user32.EmptyClipboard():
+            raise ctypes.WinError(ctypes.get_last_error())
+        if not text:
+            return
+
+        # The clipboard takes ownership of a moveable global memory block holding the text
+        buffer = ctypes.create_unicode_buffer(text)
+        handle = _kernel32.GlobalAlloc(_GMEM_MOVEABLE, ctypes.sizeof(buffer))
+        if not handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        pointer = _kernel32.GlobalLock(handle)
+        if not pointer:
+            _kernel32.GlobalFree(handle)
+            raise ctypes.WinError(ctypes.get_last_error())
+        ctypes.memmove(pointer, buffer, ctypes.sizeof(buffer))
+        _kernel32.GlobalUnlock(handle)
+
+        if not _user32.SetClipboardData(CF_UNICODETEXT, handle):
+            _kernel32.GlobalFree(handle)
+            raise ctypes.WinError(ctypes.get_last_error())
+    finally:
+        _user32.CloseClipboard()